@@ -5,8 +5,9 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-from datetime import date, timedelta, datetime
-from snowflake.snowpark.context import get_active_session
+from lib.queries import run_query
+from lib.session import get_session
+from lib.sidebar import render_date_range
 
 # Configuration and setup
 st.set_page_config(
@@ -44,26 +45,11 @@ try:
 except:
     st.sidebar.info("Streamlit version: Unable to detect")
 
-# Get active session
-session = get_active_session()
+# Get the shared session
+session = get_session()
 
-# Sidebar configuration
-st.sidebar.header("📊 Analysis Configuration")
-
-# Date range selection
-col1, col2 = st.sidebar.columns(2)
-with col1:
-    start_date = st.date_input(
-        "Start Date",
-        value=date.today() - timedelta(days=7),
-        key="start_date"
-    )
-with col2:
-    end_date = st.date_input(
-        "End Date", 
-        value=date.today() - timedelta(days = -1),
-        key="end_date"
-    )
+# Sidebar date range
+start_date, end_date = render_date_range()
 
 # Dashboard overview and navigation
 st.markdown("---")
@@ -73,19 +59,19 @@ if start_date and end_date and start_date <= end_date:
     st.header("📊 Account Overview")
     
     # Get total costs for current period
-    total_cost_query = f"""
+    total_cost_query = """
         SELECT 
             service_type,
             SUM(credits_used) AS TOTAL_CREDITS,
             SUM(credits_used_compute) AS CURRENT_COMPUTE,
             SUM(credits_used_cloud_services) AS CURRENT_CLOUD_SERVICES
         FROM SNOWFLAKE.ACCOUNT_USAGE.METERING_DAILY_HISTORY
-        WHERE usage_date >= '{start_date}' AND usage_date <= '{end_date}'
+        WHERE usage_date >= ? AND usage_date <= ?
         GROUP BY service_type
         ORDER BY TOTAL_CREDITS DESC
         """
     
-    cost_summary = session.sql(total_cost_query).to_pandas()
+    cost_summary = run_query(total_cost_query, [start_date, end_date])
     
     # Get AI costs from the same dataframe by filtering for AI_SERVICES
     ai_services_data = cost_summary[cost_summary['SERVICE_TYPE'] == 'AI_SERVICES']
@@ -0,0 +1 @@
+# Shared helpers for the admin dashboard pages
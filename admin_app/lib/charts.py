@@ -0,0 +1,10 @@
+# Import python packages
+import pandas as pd
+
+# Downcast the plotted columns to 32-bit so Plotly ships half-width arrays to the browser. Dashboard
+# credit and count values don't need 64-bit precision.
+def downcast(df, columns):
+    return df.astype({
+        col: 'int32' if pd.api.types.is_integer_dtype(df[col]) else 'float32'
+        for col in columns
+    })
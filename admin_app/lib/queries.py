@@ -0,0 +1,122 @@
+# Import python packages
+import hashlib
+import logging
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+import streamlit as st
+import pandas as pd
+from snowflake.connector.errors import ProgrammingError
+from snowflake.snowpark.exceptions import SnowparkClientException, SnowparkSQLException
+from lib.session import get_session
+
+logger = logging.getLogger(__name__)
+
+# Second-tier cache on an internal stage (see the install script). st.cache_data is lost when the app
+# instance restarts; the stage copy lets a cold start read a small Parquet file instead of re-scanning
+# ACCOUNT_USAGE. Entries older than the TTL are ignored and removed.
+CACHE_STAGE = "@snowflake_copy_cost_views.mart.app_cache"
+CACHE_TTL = timedelta(hours=1)
+
+def _stage_file_name(sql, params):
+    return hashlib.sha256(repr((sql, params)).encode()).hexdigest() + ".parquet"
+
+# If the stage is missing or the role can't use it, say so once and stop trying for this session, so
+# later queries don't each pay for a failed LIST and PUT
+def _stage_available():
+    return not st.session_state.get('stage_cache_disabled', False)
+
+def _disable_stage(error):
+    logger.warning("Result cache stage %s unavailable, querying ACCOUNT_USAGE directly: %s", CACHE_STAGE, error)
+    st.session_state.stage_cache_disabled = True
+
+# One LIST of the whole stage per uncached call, instead of one per statement. Expired entries found on
+# the way are removed in a single REMOVE, so the stage doesn't keep every result ever cached.
+def _stage_listing():
+    if not _stage_available():
+        return set()
+    session = get_session()
+    now = datetime.now(timezone.utc)
+    fresh, expired = set(), []
+    try:
+        for row in session.sql(f"LIST {CACHE_STAGE}").collect():
+            file_name = row['name'].rsplit('/', 1)[-1]
+            if now - parsedate_to_datetime(row['last_modified']) < CACHE_TTL:
+                fresh.add(file_name)
+            else:
+                expired.append(file_name)
+        if expired:
+            session.sql(f"REMOVE {CACHE_STAGE} PATTERN = '.*({'|'.join(expired)})'").collect()
+    except SnowparkClientException as e:
+        _disable_stage(e)
+    return fresh
+
+def _stage_get(file_name, arrow=False):
+    try:
+        with tempfile.TemporaryDirectory() as local_dir:
+            get_session().file.get(f"{CACHE_STAGE}/{file_name}", local_dir)
+            local_path = os.path.join(local_dir, file_name)
+            return pd.read_parquet(local_path, dtype_backend="pyarrow") if arrow else pd.read_parquet(local_path)
+    except SnowparkClientException as e:
+        _disable_stage(e)
+    except Exception as e:
+        # A corrupt or partially written entry is just a cache miss
+        logger.warning("Ignoring unreadable cache entry %s: %s", file_name, e)
+    return None
+
+def _stage_put(file_name, df):
+    if not _stage_available():
+        return
+    try:
+        with tempfile.TemporaryDirectory() as local_dir:
+            local_path = os.path.join(local_dir, file_name)
+            df.to_parquet(local_path, index=False)
+            get_session().file.put(local_path, CACHE_STAGE, auto_compress=False, overwrite=True)
+    except SnowparkClientException as e:
+        _disable_stage(e)
+
+# Display-only tables that carry query text stay Arrow-backed rather than being copied into pandas
+# object columns - Streamlit sends Arrow to the browser anyway. Async jobs only hand back rows or pandas,
+# so once such a statement has finished its result is read back as Arrow.
+def _job_result(job, arrow):
+    if not arrow:
+        return job.result(result_type="pandas")
+    job.result(result_type="no_result")
+    return job.to_df().to_arrow().to_pandas(types_mapper=pd.ArrowDtype)
+
+# Submit independent queries together as Snowpark async jobs so Snowflake runs them concurrently, then
+# wait for all of them on the script thread. Results are cached per (SQL, bind values): the admin app runs
+# with the owner's rights and no row access policy, so they are the same for every viewer. A statement
+# listed in optional that fails (e.g. a view not available in every account) comes back as an empty frame,
+# which is cached like any other result, instead of failing the whole batch.
+@st.cache_data(ttl=3600, show_spinner=False)
+def _run_queries(sqls, params, arrow, optional):
+    session = get_session()
+    file_names = [_stage_file_name(sql, params) for sql in sqls]
+    fresh = _stage_listing()
+    # Statements without a fresh stage copy are submitted first, so the cached ones download while they run
+    jobs = {
+        i: session.sql(sql, params=list(params)).collect_nowait()
+        for i, sql in enumerate(sqls) if file_names[i] not in fresh
+    }
+    results = [None if i in jobs else _stage_get(file_names[i], sql in arrow) for i, sql in enumerate(sqls)]
+    for i, sql in enumerate(sqls):
+        if results[i] is None and i not in jobs:
+            jobs[i] = session.sql(sql, params=list(params)).collect_nowait()
+    for i, job in jobs.items():
+        try:
+            results[i] = _job_result(job, sqls[i] in arrow)
+        except (SnowparkSQLException, ProgrammingError):
+            if sqls[i] not in optional:
+                raise
+            results[i] = pd.DataFrame()
+            continue
+        _stage_put(file_names[i], results[i])
+    return results
+
+def run_queries(*sqls, params=(), arrow=(), optional=()):
+    return _run_queries(sqls, tuple(params), tuple(arrow), tuple(optional))
+
+def run_query(sql, params=()):
+    return run_queries(sql, params=params)[0]
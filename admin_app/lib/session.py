@@ -0,0 +1,12 @@
+# Import python packages
+import streamlit as st
+from snowflake.snowpark.context import get_active_session
+
+# Reuse one Snowpark session across reruns and pages. It is pinned in st.session_state rather than
+# st.cache_resource so each viewer keeps their own session. Only call it from the script thread - a worker
+# thread has no ScriptRunContext, so it would get a throwaway session state and a fresh session. Use
+# run_queries to overlap independent queries instead.
+def get_session():
+    if 'snowpark_session' not in st.session_state:
+        st.session_state.snowpark_session = get_active_session()
+    return st.session_state.snowpark_session
@@ -0,0 +1,25 @@
+# Import python packages
+import streamlit as st
+from datetime import date, timedelta
+
+# Sidebar date range shared by every admin page. The dates sit inside a form so changing both of them
+# triggers a single rerun, and the widget keys are the same on every page.
+def render_date_range(days_back=7):
+    st.sidebar.header("📊 Analysis Configuration")
+    today = date.today()
+    with st.sidebar.form("date_range_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            start_date = st.date_input(
+                "Start Date",
+                value=today - timedelta(days=days_back),
+                key="start_date"
+            )
+        with col2:
+            end_date = st.date_input(
+                "End Date",
+                value=today + timedelta(days=1),
+                key="end_date"
+            )
+        st.form_submit_button("Apply", use_container_width=True)
+    return start_date, end_date
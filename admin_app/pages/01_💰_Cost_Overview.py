@@ -5,8 +5,9 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-from datetime import date, timedelta, datetime
-from snowflake.snowpark.context import get_active_session
+from lib.charts import downcast
+from lib.queries import run_queries
+from lib.sidebar import render_date_range
 
 st.set_page_config(
     page_title="Cost Overview - Snowflake Dashboard",
@@ -35,95 +36,35 @@ st.markdown("""
 st.title("💰 Account Cost Overview")
 st.markdown("Track total costs and daily trends across your Snowflake account")
 
-# Get active session
-session = get_active_session()
-
-# Sidebar configuration
-st.sidebar.header("📊 Analysis Configuration")
-
-# Date range selection
-col1, col2 = st.sidebar.columns(2)
-with col1:
-    start_date = st.date_input(
-        "Start Date",
-        value=date.today() - timedelta(days=7),
-        key="start_date"
-    )
-with col2:
-    end_date = st.date_input(
-        "End Date", 
-        value=date.today() - timedelta(days=-1),
-        key="end_date"
-    )
+# Sidebar date range
+start_date, end_date = render_date_range()
 
 if start_date and end_date and start_date <= end_date:
     # Get total costs for current period
-    total_cost_query = f"""
+    total_cost_query = """
     SELECT 
         SUM(qa.CREDITS_ATTRIBUTED_COMPUTE + COALESCE(qa.CREDITS_USED_QUERY_ACCELERATION, 0)) as current_compute,
         SUM(COALESCE(qh.CREDITS_USED_CLOUD_SERVICES, 0)) as current_cloud_services
     FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_ATTRIBUTION_HISTORY qa
     INNER JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON qa.QUERY_ID = qh.QUERY_ID
-    WHERE qa.START_TIME >= '{start_date}' AND qa.START_TIME <= '{end_date}'
+    WHERE qa.START_TIME >= ? AND qa.START_TIME <= ?
     """
     
     # Get AI costs separately (may not be available in all accounts)
-    ai_cost_query = f"""
+    ai_cost_query = """
     SELECT 
         COALESCE(SUM(cf.TOKEN_CREDITS), 0) as current_ai
     FROM SNOWFLAKE.ACCOUNT_USAGE.CORTEX_FUNCTIONS_QUERY_USAGE_HISTORY cf
-    INNER JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON cf.QUERY_ID = qh.QUERY_ID
-    WHERE qh.START_TIME >= '{start_date}' AND qh.START_TIME <= '{end_date}'
+    -- Prune QUERY_HISTORY by date before the join (the Cortex view has no timestamp to filter on)
+    INNER JOIN (
+        SELECT QUERY_ID
+        FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+        WHERE START_TIME >= ? AND START_TIME <= ?
+    ) qh USING (QUERY_ID)
     """
     
-    cost_summary = session.sql(total_cost_query).to_pandas()
-    
-    # Try to get AI costs, handle gracefully if not available
-    ai_current = 0
-    try:
-        ai_cost_result = session.sql(ai_cost_query).to_pandas()
-        if not ai_cost_result.empty:
-            ai_current = ai_cost_result['CURRENT_AI'].iloc[0] or 0
-    except Exception as e:
-        st.sidebar.warning("⚠️ AI cost tracking not available in this account")
-        ai_current = 0
-    
-    if not cost_summary.empty:
-        current_total = (
-            cost_summary['CURRENT_COMPUTE'].iloc[0] + 
-            cost_summary['CURRENT_CLOUD_SERVICES'].iloc[0] + 
-            ai_current
-        )
-        
-        # Display key metrics
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            st.metric(
-                "Total Credits",
-                f"{current_total:,.1f}"
-            )
-        
-        with col2:
-            st.metric(
-                "Compute Credits",
-                f"{cost_summary['CURRENT_COMPUTE'].iloc[0]:,.1f}"
-            )
-        
-        with col3:
-            st.metric(
-                "Cloud Services Credits", 
-                f"{cost_summary['CURRENT_CLOUD_SERVICES'].iloc[0]:,.1f}"
-            )
-        
-        with col4:
-            st.metric(
-                "AI Credits",
-                f"{ai_current:,.1f}"
-            )
-
     # Daily cost trend
-    daily_cost_query = f"""
+    daily_cost_query = """
     SELECT 
         DATE_TRUNC('day', qa.START_TIME)::DATE as usage_date,
         SUM(qa.CREDITS_ATTRIBUTED_COMPUTE + COALESCE(qa.CREDITS_USED_QUERY_ACCELERATION, 0)) as compute_credits,
@@ -132,17 +73,67 @@ if start_date and end_date and start_date <= end_date:
         COUNT(DISTINCT qa.WAREHOUSE_NAME) as active_warehouses
     FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_ATTRIBUTION_HISTORY qa
     INNER JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON qa.QUERY_ID = qh.QUERY_ID
-    WHERE qa.START_TIME >= '{start_date}' AND qa.START_TIME <= '{end_date}'
+    WHERE qa.START_TIME >= ? AND qa.START_TIME <= ?
     GROUP BY 1
     ORDER BY 1
     """
     
-    daily_costs = session.sql(daily_cost_query).to_pandas()
+    # The three queries are independent, so submit them together as async jobs to overlap their round-trips.
+    # The Cortex view isn't available in every account, so the AI query comes back empty if it fails.
+    cost_summary, ai_cost_result, daily_costs = run_queries(
+        total_cost_query, ai_cost_query, daily_cost_query, params=[start_date, end_date], optional=[ai_cost_query]
+    )
+    
+    ai_current = 0
+    if ai_cost_result.empty:
+        st.sidebar.warning("⚠️ AI cost tracking not available in this account")
+    else:
+        ai_current = float(ai_cost_result['CURRENT_AI'].fillna(0).iloc[0])
+    
+    # The totals are single aggregate rows
+    cost_summary = cost_summary.fillna(0).iloc[0]
+    compute_credits = float(cost_summary['CURRENT_COMPUTE'])
+    cloud_services_credits = float(cost_summary['CURRENT_CLOUD_SERVICES'])
+    
+    current_total = (
+        compute_credits + 
+        cloud_services_credits + 
+        ai_current
+    )
+    
+    # Display key metrics
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric(
+            "Total Credits",
+            f"{current_total:,.1f}"
+        )
+    
+    with col2:
+        st.metric(
+            "Compute Credits",
+            f"{compute_credits:,.1f}"
+        )
+    
+    with col3:
+        st.metric(
+            "Cloud Services Credits", 
+            f"{cloud_services_credits:,.1f}"
+        )
+    
+    with col4:
+        st.metric(
+            "AI Credits",
+            f"{ai_current:,.1f}"
+        )
     
     if not daily_costs.empty:
         # Add total costs column
         daily_costs['total_credits'] = daily_costs['COMPUTE_CREDITS'] + daily_costs['CLOUD_SERVICES_CREDITS']
         
+        daily_costs = downcast(daily_costs, ['COMPUTE_CREDITS', 'CLOUD_SERVICES_CREDITS', 'ACTIVE_USERS'])
+        
         # Create dual-axis chart
         fig = make_subplots(
             rows=1, cols=1,
@@ -199,25 +190,24 @@ if start_date and end_date and start_date <= end_date:
         st.plotly_chart(fig, use_container_width=True)
 
     # Cost breakdown pie chart
-    if not cost_summary.empty:
-        cost_breakdown = pd.DataFrame({
-            'Category': ['Compute', 'Cloud Services', 'AI Functions'],
-            'Credits': [
-                cost_summary['CURRENT_COMPUTE'].iloc[0],
-                cost_summary['CURRENT_CLOUD_SERVICES'].iloc[0], 
-                ai_current
-            ]
-        })
-        
-        fig_pie = px.pie(
-            cost_breakdown,
-            values='Credits',
-            names='Category',
-            title="Cost Breakdown by Category",
-            color_discrete_sequence=['#1f77b4', '#ff7f0e', '#2ca02c']
-        )
-        
-        st.plotly_chart(fig_pie, use_container_width=True)
+    cost_breakdown = pd.DataFrame({
+        'Category': ['Compute', 'Cloud Services', 'AI Functions'],
+        'Credits': [
+            compute_credits,
+            cloud_services_credits, 
+            ai_current
+        ]
+    })
+    
+    fig_pie = px.pie(
+        cost_breakdown,
+        values='Credits',
+        names='Category',
+        title="Cost Breakdown by Category",
+        color_discrete_sequence=['#1f77b4', '#ff7f0e', '#2ca02c']
+    )
+    
+    st.plotly_chart(fig_pie, use_container_width=True)
 
 else:
     st.error("Please select a valid date range to begin analysis.")
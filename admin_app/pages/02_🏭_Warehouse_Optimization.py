@@ -5,8 +5,8 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-from datetime import date, timedelta, datetime
-from snowflake.snowpark.context import get_active_session
+from lib.queries import run_query
+from lib.sidebar import render_date_range
 
 st.set_page_config(
     page_title="Warehouse Optimization - Snowflake Dashboard",
@@ -35,30 +35,12 @@ st.markdown("""
 st.title("🏭 Warehouse Optimization")
 st.markdown("Analyze warehouse utilization, efficiency, and identify optimization opportunities")
 
-# Get active session
-session = get_active_session()
-
-# Sidebar configuration
-st.sidebar.header("📊 Analysis Configuration")
-
-# Date range selection
-col1, col2 = st.sidebar.columns(2)
-with col1:
-    start_date = st.date_input(
-        "Start Date",
-        value=date.today() - timedelta(days=7),
-        key="start_date"
-    )
-with col2:
-    end_date = st.date_input(
-        "End Date", 
-        value=date.today() - timedelta(days=-1),
-        key="end_date"
-    )
+# Sidebar date range
+start_date, end_date = render_date_range()
 
 if start_date and end_date and start_date <= end_date:
     # Warehouse utilization and cost analysis
-    warehouse_analysis_query = f"""
+    warehouse_analysis_query = """
     WITH warehouse_stats AS (
         SELECT 
             q.WAREHOUSE_NAME,
@@ -70,7 +52,7 @@ if start_date and end_date and start_date <= end_date:
             COUNT(DISTINCT q.USER_NAME) as unique_users
         FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_ATTRIBUTION_HISTORY q
         JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON q.QUERY_ID = qh.QUERY_ID
-        WHERE q.START_TIME >= '{start_date}' AND q.START_TIME <= '{end_date}'
+        WHERE q.START_TIME >= ? AND q.START_TIME <= ?
         AND q.WAREHOUSE_NAME IS NOT NULL
         GROUP BY 1, 2
     ),
@@ -102,7 +84,7 @@ if start_date and end_date and start_date <= end_date:
     ORDER BY total_credits DESC
     """
     
-    warehouse_data = session.sql(warehouse_analysis_query).to_pandas()
+    warehouse_data = run_query(warehouse_analysis_query, [start_date, end_date])
     
     if not warehouse_data.empty:
         st.subheader("Warehouse Cost Summary")
@@ -5,8 +5,8 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-from datetime import date, timedelta, datetime
-from snowflake.snowpark.context import get_active_session
+from lib.queries import run_query
+from lib.sidebar import render_date_range
 
 st.set_page_config(
     page_title="User Cost Analysis - Snowflake Dashboard",
@@ -35,30 +35,12 @@ st.markdown("""
 st.title("👥 User Cost Analysis")
 st.markdown("Analyze user activity, costs, and identify optimization opportunities")
 
-# Get active session
-session = get_active_session()
-
-# Sidebar configuration
-st.sidebar.header("📊 Analysis Configuration")
-
-# Date range selection
-col1, col2 = st.sidebar.columns(2)
-with col1:
-    start_date = st.date_input(
-        "Start Date",
-        value=date.today() - timedelta(days=7),
-        key="start_date"
-    )
-with col2:
-    end_date = st.date_input(
-        "End Date", 
-        value=date.today() - timedelta(days=-1),
-        key="end_date"
-    )
+# Sidebar date range
+start_date, end_date = render_date_range()
 
 if start_date and end_date and start_date <= end_date:
     # User cost analysis
-    user_cost_query = f"""
+    user_cost_query = """
     WITH user_costs AS (
         SELECT 
             q.USER_NAME,
@@ -71,7 +53,7 @@ if start_date and end_date and start_date <= end_date:
             COUNT(DISTINCT DATE_TRUNC('day', q.START_TIME)) as active_days
         FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_ATTRIBUTION_HISTORY q
         JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON q.QUERY_ID = qh.QUERY_ID
-        WHERE q.START_TIME >= '{start_date}' AND q.START_TIME <= '{end_date}'
+        WHERE q.START_TIME >= ? AND q.START_TIME <= ?
         GROUP BY 1
     ),
     user_ai_costs AS (
@@ -80,8 +62,11 @@ if start_date and end_date and start_date <= end_date:
             SUM(cf.TOKEN_CREDITS) as ai_credits,
             COUNT(*) as ai_queries
         FROM SNOWFLAKE.ACCOUNT_USAGE.CORTEX_FUNCTIONS_QUERY_USAGE_HISTORY cf
-        JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON cf.QUERY_ID = qh.QUERY_ID
-        WHERE qh.START_TIME >= '{start_date}' AND qh.START_TIME <= '{end_date}'
+        JOIN (
+            SELECT QUERY_ID, USER_NAME
+            FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+            WHERE START_TIME >= ? AND START_TIME <= ?
+        ) qh USING (QUERY_ID)
         GROUP BY 1
     )
     SELECT 
@@ -102,7 +87,7 @@ if start_date and end_date and start_date <= end_date:
     ORDER BY "Total Credits" DESC
     """
     
-    user_data = session.sql(user_cost_query).to_pandas()
+    user_data = run_query(user_cost_query, [start_date, end_date] * 2)
     
     if not user_data.empty:
         # Top users summary
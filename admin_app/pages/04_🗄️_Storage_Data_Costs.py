@@ -5,8 +5,8 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-from datetime import date, timedelta, datetime
-from snowflake.snowpark.context import get_active_session
+from lib.queries import run_queries
+from lib.sidebar import render_date_range
 
 st.set_page_config(
     page_title="Storage & Data Costs - Snowflake Dashboard",
@@ -36,30 +36,12 @@ st.title("🗄️ Storage & Data Costs")
 st.markdown("Analyze data transfer and scanning costs across your Snowflake account")
 st.info("📝 Storage cost analysis requires additional Snowflake account usage views. This section shows data transfer and scanning costs.")
 
-# Get active session
-session = get_active_session()
-
-# Sidebar configuration
-st.sidebar.header("📊 Analysis Configuration")
-
-# Date range selection
-col1, col2 = st.sidebar.columns(2)
-with col1:
-    start_date = st.date_input(
-        "Start Date",
-        value=date.today() - timedelta(days=7),
-        key="start_date"
-    )
-with col2:
-    end_date = st.date_input(
-        "End Date", 
-        value=date.today() - timedelta(days=-1),
-        key="end_date"
-    )
+# Sidebar date range
+start_date, end_date = render_date_range()
 
 if start_date and end_date and start_date <= end_date:
     # Data scanning analysis
-    data_scanning_query = f"""
+    data_scanning_query = """
     SELECT 
         DATE_TRUNC('day', q.START_TIME)::DATE as usage_date,
         SUM(qh.BYTES_SCANNED) / POWER(1024, 4) as total_tb_scanned,
@@ -68,13 +50,33 @@ if start_date and end_date and start_date <= end_date:
         SUM(q.CREDITS_ATTRIBUTED_COMPUTE) as scanning_related_credits
     FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_ATTRIBUTION_HISTORY q
     JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON q.QUERY_ID = qh.QUERY_ID
-    WHERE q.START_TIME >= '{start_date}' AND q.START_TIME <= '{end_date}'
+    WHERE q.START_TIME >= ? AND q.START_TIME <= ?
     AND qh.BYTES_SCANNED > 0
     GROUP BY 1
     ORDER BY 1
     """
     
-    scanning_data = session.sql(data_scanning_query).to_pandas()
+    # Large scan queries
+    large_scan_query = """
+    SELECT 
+        q.USER_NAME,
+        qh.QUERY_TEXT,
+        qh.BYTES_SCANNED / POWER(1024, 3) as gb_scanned,
+        q.CREDITS_ATTRIBUTED_COMPUTE as credits,
+        qh.EXECUTION_TIME / 1000 as execution_seconds,
+        q.START_TIME
+    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_ATTRIBUTION_HISTORY q
+    JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON q.QUERY_ID = qh.QUERY_ID
+    WHERE q.START_TIME >= ? AND q.START_TIME <= ?
+    AND qh.BYTES_SCANNED > 0
+    ORDER BY qh.BYTES_SCANNED DESC
+    LIMIT 20
+    """
+    
+    # Both queries are independent, so submit them together as async jobs to overlap their round-trips
+    scanning_data, large_scans = run_queries(
+        data_scanning_query, large_scan_query, params=[start_date, end_date], arrow=[large_scan_query]
+    )
     
     if not scanning_data.empty:
         # Data scanning metrics
@@ -136,25 +138,6 @@ if start_date and end_date and start_date <= end_date:
         
         st.plotly_chart(fig_efficiency, use_container_width=True)
         
-        # Large scan queries
-        large_scan_query = f"""
-        SELECT 
-            q.USER_NAME,
-            qh.QUERY_TEXT,
-            qh.BYTES_SCANNED / POWER(1024, 3) as gb_scanned,
-            q.CREDITS_ATTRIBUTED_COMPUTE as credits,
-            qh.EXECUTION_TIME / 1000 as execution_seconds,
-            q.START_TIME
-        FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_ATTRIBUTION_HISTORY q
-        JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON q.QUERY_ID = qh.QUERY_ID
-        WHERE q.START_TIME >= '{start_date}' AND q.START_TIME <= '{end_date}'
-        AND qh.BYTES_SCANNED > 0
-        ORDER BY qh.BYTES_SCANNED DESC
-        LIMIT 20
-        """
-        
-        large_scans = session.sql(large_scan_query).to_pandas()
-        
         if not large_scans.empty:
             st.subheader("🔍 Top 20 Queries by Data Scanned")
             # Truncate query text for display
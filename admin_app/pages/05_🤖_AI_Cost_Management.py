@@ -5,8 +5,9 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-from datetime import date, timedelta, datetime
-from snowflake.snowpark.context import get_active_session
+from lib.charts import downcast
+from lib.queries import run_query
+from lib.sidebar import render_date_range
 
 st.set_page_config(
     page_title="AI Cost Management - Snowflake Dashboard",
@@ -35,30 +36,12 @@ st.markdown("""
 st.title("🤖 AI Cost Management")
 st.markdown("Track AI function usage, costs, and optimization opportunities")
 
-# Get active session
-session = get_active_session()
-
-# Sidebar configuration
-st.sidebar.header("📊 Analysis Configuration")
-
-# Date range selection
-col1, col2 = st.sidebar.columns(2)
-with col1:
-    start_date = st.date_input(
-        "Start Date",
-        value=date.today() - timedelta(days=7),
-        key="start_date"
-    )
-with col2:
-    end_date = st.date_input(
-        "End Date", 
-        value=date.today() - timedelta(days=-1),
-        key="end_date"
-    )
+# Sidebar date range
+start_date, end_date = render_date_range()
 
 if start_date and end_date and start_date <= end_date:
     # AI usage summary
-    ai_summary_query = f"""
+    ai_summary_query = """
     WITH ai_summary AS (
         SELECT 
             DATE_TRUNC('day', qh.START_TIME)::DATE as usage_date,
@@ -69,8 +52,11 @@ if start_date and end_date and start_date <= end_date:
             COUNT(*) as request_count,
             COUNT(DISTINCT qh.USER_NAME) as unique_users
         FROM SNOWFLAKE.ACCOUNT_USAGE.CORTEX_FUNCTIONS_QUERY_USAGE_HISTORY cf
-        JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON cf.QUERY_ID = qh.QUERY_ID
-        WHERE qh.START_TIME >= '{start_date}' AND qh.START_TIME <= '{end_date}'
+        JOIN (
+            SELECT QUERY_ID, START_TIME, USER_NAME
+            FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY
+            WHERE START_TIME >= ? AND START_TIME <= ?
+        ) qh USING (QUERY_ID)
         GROUP BY 1, 2, 3
     )
     SELECT 
@@ -87,7 +73,7 @@ if start_date and end_date and start_date <= end_date:
     ORDER BY usage_date DESC, total_credits DESC
     """
     
-    ai_data = session.sql(ai_summary_query).to_pandas()
+    ai_data = run_query(ai_summary_query, [start_date, end_date])
     
     if not ai_data.empty:
         # AI cost metrics
@@ -117,6 +103,8 @@ if start_date and end_date and start_date <= end_date:
             'UNIQUE_USERS': 'sum'
         }).reset_index()
         
+        daily_ai = downcast(daily_ai, ['CREDITS', 'REQUEST_COUNT', 'UNIQUE_USERS'])
+        
         # Format dates as YYYY-MM-DD strings
         daily_ai['USAGE_DATE_STR'] = pd.to_datetime(daily_ai['USAGE_DATE']).dt.strftime('%Y-%m-%d')
         
@@ -5,8 +5,8 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-from datetime import date, timedelta, datetime
-from snowflake.snowpark.context import get_active_session
+from lib.queries import run_queries
+from lib.sidebar import render_date_range
 
 st.set_page_config(
     page_title="Query Efficiency - Snowflake Dashboard",
@@ -35,30 +35,12 @@ st.markdown("""
 st.title("⚡ Query Efficiency")
 st.markdown("Analyze query performance, identify failures, and optimize execution efficiency")
 
-# Get active session
-session = get_active_session()
-
-# Sidebar configuration
-st.sidebar.header("📊 Analysis Configuration")
-
-# Date range selection
-col1, col2 = st.sidebar.columns(2)
-with col1:
-    start_date = st.date_input(
-        "Start Date",
-        value=date.today() - timedelta(days=7),
-        key="start_date"
-    )
-with col2:
-    end_date = st.date_input(
-        "End Date", 
-        value=date.today() - timedelta(days=-1),
-        key="end_date"
-    )
+# Sidebar date range
+start_date, end_date = render_date_range()
 
 if start_date and end_date and start_date <= end_date:
     # Query efficiency analysis
-    efficiency_query = f"""
+    efficiency_query = """
     WITH query_efficiency AS (
         SELECT 
             q.QUERY_ID,
@@ -75,7 +57,7 @@ if start_date and end_date and start_date <= end_date:
             qh.QUERY_TEXT
         FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_ATTRIBUTION_HISTORY q
         JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON q.QUERY_ID = qh.QUERY_ID
-        WHERE q.START_TIME >= '{start_date}' AND q.START_TIME <= '{end_date}'
+        WHERE q.START_TIME >= ? AND q.START_TIME <= ?
         AND qh.EXECUTION_TIME > 0
     )
     SELECT 
@@ -90,11 +72,44 @@ if start_date and end_date and start_date <= end_date:
     FROM query_efficiency
     """
     
-    efficiency_summary = session.sql(efficiency_query).to_pandas()
+    # Problem queries analysis
+    problem_queries_query = """
+    SELECT 
+        q.USER_NAME,
+        q.WAREHOUSE_NAME,
+        qh.EXECUTION_TIME / 1000 as execution_seconds,
+        q.CREDITS_ATTRIBUTED_COMPUTE + COALESCE(q.CREDITS_USED_QUERY_ACCELERATION, 0) as credits,
+        qh.BYTES_SPILLED_TO_LOCAL_STORAGE + qh.BYTES_SPILLED_TO_REMOTE_STORAGE as spillage_bytes,
+        qh.EXECUTION_STATUS,
+        qh.ERROR_CODE,
+        LEFT(qh.QUERY_TEXT, 200) as query_preview,
+        q.START_TIME,
+        CASE 
+            WHEN qh.EXECUTION_STATUS = 'FAILED' THEN 'failed'
+            WHEN qh.EXECUTION_TIME > 300000 THEN 'long'
+            ELSE 'spill'
+        END as problem_type
+    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_ATTRIBUTION_HISTORY q
+    JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON q.QUERY_ID = qh.QUERY_ID
+    WHERE q.START_TIME >= ? AND q.START_TIME <= ?
+    AND (
+        qh.EXECUTION_STATUS = 'FAILED' 
+        OR qh.EXECUTION_TIME > 300000  -- 5 minutes
+        OR (qh.BYTES_SPILLED_TO_LOCAL_STORAGE + qh.BYTES_SPILLED_TO_REMOTE_STORAGE) > 0
+    )
+    ORDER BY credits DESC
+    LIMIT 50
+    """
+    
+    # Both queries are independent, so submit them together as async jobs to overlap their round-trips.
+    # The summary is a single aggregate row
+    summary, problem_queries = run_queries(
+        efficiency_query, problem_queries_query, params=[start_date, end_date], arrow=[problem_queries_query]
+    )
+    row = summary.iloc[0]
     
-    if not efficiency_summary.empty:
+    if row['TOTAL_QUERIES']:
         # Efficiency metrics
-        row = efficiency_summary.iloc[0]
         
         col1, col2, col3, col4 = st.columns(4)
         
@@ -113,56 +128,33 @@ if start_date and end_date and start_date <= end_date:
         with col4:
             st.metric("Avg Execution Time", f"{row['AVG_EXECUTION_SECONDS']:.1f}s")
         
-        # Problem queries analysis
-        problem_queries_query = f"""
-        SELECT 
-            q.USER_NAME,
-            q.WAREHOUSE_NAME,
-            qh.EXECUTION_TIME / 1000 as execution_seconds,
-            q.CREDITS_ATTRIBUTED_COMPUTE + COALESCE(q.CREDITS_USED_QUERY_ACCELERATION, 0) as credits,
-            qh.BYTES_SPILLED_TO_LOCAL_STORAGE + qh.BYTES_SPILLED_TO_REMOTE_STORAGE as spillage_bytes,
-            qh.EXECUTION_STATUS,
-            qh.ERROR_CODE,
-            LEFT(qh.QUERY_TEXT, 200) as query_preview,
-            q.START_TIME
-        FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_ATTRIBUTION_HISTORY q
-        JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON q.QUERY_ID = qh.QUERY_ID
-        WHERE q.START_TIME >= '{start_date}' AND q.START_TIME <= '{end_date}'
-        AND (
-            qh.EXECUTION_STATUS = 'FAILED' 
-            OR qh.EXECUTION_TIME > 300000  -- 5 minutes
-            OR (qh.BYTES_SPILLED_TO_LOCAL_STORAGE + qh.BYTES_SPILLED_TO_REMOTE_STORAGE) > 0
-        )
-        ORDER BY credits DESC
-        LIMIT 50
-        """
-        
-        problem_queries = session.sql(problem_queries_query).to_pandas()
-        
         if not problem_queries.empty:
             st.subheader("🚨 Problem Queries Requiring Attention")
             
+            # Split the problem queries by their SQL-computed category in a single pass
+            problem_groups = dict(tuple(problem_queries.groupby('PROBLEM_TYPE')))
+            
             # Create tabs for different problem types
             prob_tab1, prob_tab2, prob_tab3 = st.tabs(["Failed Queries", "Long Running", "Spillage"])
             
             with prob_tab1:
-                failed = problem_queries[problem_queries['EXECUTION_STATUS'] == 'FAILED']
-                if not failed.empty:
+                failed = problem_groups.get('failed')
+                if failed is not None:
                     st.dataframe(failed[['USER_NAME', 'WAREHOUSE_NAME', 'ERROR_CODE', 'QUERY_PREVIEW', 'START_TIME']], use_container_width=True)
                 else:
                     st.success("No failed queries in this period!")
             
             with prob_tab2:
-                long_running = problem_queries[problem_queries['EXECUTION_SECONDS'] > 300]
-                if not long_running.empty:
+                long_running = problem_groups.get('long')
+                if long_running is not None:
                     st.dataframe(long_running[['USER_NAME', 'WAREHOUSE_NAME', 'EXECUTION_SECONDS', 'CREDITS', 'QUERY_PREVIEW']], use_container_width=True)
                 else:
                     st.success("No long running queries in this period!")
             
             with prob_tab3:
-                spillage = problem_queries[problem_queries['SPILLAGE_BYTES'] > 0]
-                if not spillage.empty:
-                    spillage['spillage_gb'] = spillage['SPILLAGE_BYTES'] / (1024**3)
+                spillage = problem_groups.get('spill')
+                if spillage is not None:
+                    spillage = spillage.assign(spillage_gb=spillage['SPILLAGE_BYTES'] / (1024**3))
                     st.dataframe(spillage[['USER_NAME', 'WAREHOUSE_NAME', 'spillage_gb', 'CREDITS', 'QUERY_PREVIEW']], use_container_width=True)
                 else:
                     st.success("No queries with spillage in this period!")
@@ -5,8 +5,10 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-from datetime import date, timedelta, datetime
-from snowflake.snowpark.context import get_active_session
+from datetime import timedelta
+from lib.charts import downcast
+from lib.queries import run_query
+from lib.sidebar import render_date_range
 
 st.set_page_config(
     page_title="Cost Forecasting - Snowflake Dashboard",
@@ -35,41 +37,23 @@ st.markdown("""
 st.title("📈 Cost Forecasting")
 st.markdown("Predict future costs based on historical trends and usage patterns")
 
-# Get active session
-session = get_active_session()
-
-# Sidebar configuration
-st.sidebar.header("📊 Analysis Configuration")
-
-# Date range selection
-col1, col2 = st.sidebar.columns(2)
-with col1:
-    start_date = st.date_input(
-        "Start Date",
-        value=date.today() - timedelta(days=7),
-        key="start_date"
-    )
-with col2:
-    end_date = st.date_input(
-        "End Date", 
-        value=date.today() - timedelta(days=-1),
-        key="end_date"
-    )
+# Sidebar date range
+start_date, end_date = render_date_range()
 
 if start_date and end_date and start_date <= end_date:
     # Get current period data for forecasting
-    forecast_query = f"""
+    forecast_query = """
     SELECT 
         DATE_TRUNC('day', qa.START_TIME)::DATE as usage_date,
         SUM(qa.CREDITS_ATTRIBUTED_COMPUTE + COALESCE(qa.CREDITS_USED_QUERY_ACCELERATION, 0) + COALESCE(qh.CREDITS_USED_CLOUD_SERVICES, 0)) as daily_credits
     FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_ATTRIBUTION_HISTORY qa
     LEFT JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON qa.QUERY_ID = qh.QUERY_ID
-    WHERE qa.START_TIME >= '{start_date}' AND qa.START_TIME <= '{end_date}'
+    WHERE qa.START_TIME >= ? AND qa.START_TIME <= ?
     GROUP BY 1
     ORDER BY 1
     """
     
-    forecast_data = session.sql(forecast_query).to_pandas()
+    forecast_data = run_query(forecast_query, [start_date, end_date])
     
     if not forecast_data.empty:
         # Calculate current period statistics
@@ -93,10 +77,12 @@ if start_date and end_date and start_date <= end_date:
         # Current period visualization with projection
         fig_forecast = go.Figure()
         
+        daily_credits = downcast(forecast_data, ['DAILY_CREDITS'])['DAILY_CREDITS']
+        
         # Current period data
         fig_forecast.add_trace(go.Scatter(
             x=forecast_data['USAGE_DATE'],
-            y=forecast_data['DAILY_CREDITS'],
+            y=daily_credits,
             mode='lines+markers',
             name='Daily Credits',
             line=dict(color='blue'),
@@ -106,7 +92,7 @@ if start_date and end_date and start_date <= end_date:
         # Add average line for current period
         fig_forecast.add_trace(go.Scatter(
             x=forecast_data['USAGE_DATE'],
-            y=[avg_daily_credits] * len(forecast_data),
+            y=np.full(len(forecast_data), avg_daily_credits, dtype=np.float32),
             mode='lines',
             name=f'Period Average ({avg_daily_credits:.1f})',
             line=dict(color='orange', width=2, dash='dot')
@@ -125,7 +111,7 @@ if start_date and end_date and start_date <= end_date:
                 # Project next 30 days
                 future_dates = [forecast_data['USAGE_DATE'].iloc[-1] + timedelta(days=i+1) for i in range(30)]
                 future_x = np.arange(len(forecast_data), len(forecast_data) + 30)
-                future_y = np.polyval(z, future_x)
+                future_y = np.polyval(z, future_x).astype(np.float32)
                 
                 fig_forecast.add_trace(go.Scatter(
                     x=future_dates,
@@ -5,8 +5,9 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-from datetime import date, timedelta, datetime
-from snowflake.snowpark.context import get_active_session
+from datetime import date, timedelta
+from lib.queries import run_query
+from lib.sidebar import render_date_range
 
 st.set_page_config(
     page_title="Savings Opportunities - Snowflake Dashboard",
@@ -14,8 +15,8 @@ st.set_page_config(
     layout="wide"
 )
 
-# Custom CSS for better styling
-st.markdown("""
+# Static HTML/CSS fragments, built once at import instead of on every rerun
+SAVINGS_CSS = """
 <style>
     .metric-card {
         background-color: #f0f2f6;
@@ -30,121 +31,178 @@ st.markdown("""
         border-left: 4px solid #ffc107;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
 
-st.title("🎯 Consolidated Savings Opportunities")
-st.markdown("Identify and prioritize cost optimization opportunities across your Snowflake account")
-
-st.markdown("""
+SUMMARY_HTML = """
 <div class="metric-card">
     <h3>💡 Cost Optimization Summary</h3>
     <p>This section consolidates all identified savings opportunities across your Snowflake account.</p>
 </div>
-""", unsafe_allow_html=True)
+"""
 
-# Get active session
-session = get_active_session()
+WAREHOUSE_OPP_HTML = """
+<div class="savings-opportunity">
+    <h4>🏭 Warehouse Optimization (Highest Impact)</h4>
+    <ul>
+        <li>Review underutilized warehouses for consolidation opportunities</li>
+        <li>Right-size warehouses based on actual workload patterns</li>
+        <li>Implement auto-suspend policies for idle warehouses</li>
+    </ul>
+</div>
+"""
 
-# Sidebar configuration
-st.sidebar.header("📊 Analysis Configuration")
+QUERY_OPP_HTML = """
+<div class="savings-opportunity">
+    <h4>⚡ Query Optimization</h4>
+    <ul>
+        <li>Provide query performance training to high-cost users</li>
+        <li>Implement query monitoring and alerting</li>
+        <li>Review and optimize frequently failing queries</li>
+        <li>Address memory spillage through query tuning or warehouse sizing</li>
+    </ul>
+</div>
+"""
 
-# Date range selection
-col1, col2 = st.sidebar.columns(2)
-with col1:
-    start_date = st.date_input(
-        "Start Date",
-        value=date.today() - timedelta(days=7),
-        key="start_date"
-    )
-with col2:
-    end_date = st.date_input(
-        "End Date", 
-        value=date.today() - timedelta(days=-1),
-        key="end_date"
-    )
+AI_OPP_HTML = """
+<div class="savings-opportunity">
+    <h4>🤖 AI Cost Management</h4>
+    <ul>
+        <li>Review AI function usage patterns for optimization opportunities</li>
+        <li>Consider model selection based on cost-effectiveness</li>
+        <li>Implement AI usage governance and monitoring</li>
+    </ul>
+</div>
+"""
 
-if start_date and end_date and start_date <= end_date:
-    # Aggregate all savings opportunities
-    savings_opportunities = []
-    
-    # Warehouse optimization savings
-    warehouse_savings_query = f"""
-    WITH warehouse_inefficiency AS (
+BEST_PRACTICES_HTML = """
+<div class="metric-card">
+    <h4>✅ Best Practices Checklist</h4>
+    <ul>
+        <li>Regular monitoring of warehouse utilization</li>
+        <li>Ongoing query performance optimization</li>
+        <li>AI usage cost tracking</li>
+        <li>User education on efficient query practices</li>
+        <li>Periodic cost trend analysis</li>
+    </ul>
+</div>
+"""
+
+# Custom CSS for better styling - re-emitted each run, since Streamlit drops elements a rerun does not render
+st.markdown(SAVINGS_CSS, unsafe_allow_html=True)
+
+st.title("🎯 Consolidated Savings Opportunities")
+st.markdown("Identify and prioritize cost optimization opportunities across your Snowflake account")
+
+st.markdown(SUMMARY_HTML, unsafe_allow_html=True)
+
+# Sidebar date range
+start_date, end_date = render_date_range()
+
+# The savings and AI roll-ups keep a rolling window of this many days (see the install script)
+ROLLUP_DAYS = 90
+
+# Savings data per date range, cached in memory and on the stage by run_query
+def fetch_savings(start_date, end_date):
+    # All savings opportunities are fetched in a single round-trip; each UNION ALL
+    # branch is tagged with a SECTION so the result can be split client-side
+    savings_query = """
+    WITH base AS (
+        -- Pre-aggregated daily roll-up (see the install script) instead of scanning ACCOUNT_USAGE on every load
+        SELECT *
+        FROM snowflake_copy_cost_views.mart.savings_daily_rollup
+        WHERE usage_date >= ? AND usage_date <= ?
+    ),
+    warehouse_inefficiency AS (
         SELECT 
-            q.WAREHOUSE_NAME,
-            SUM(q.CREDITS_ATTRIBUTED_COMPUTE) as total_credits,
-            COUNT(DISTINCT q.QUERY_ID) as total_queries,
-            AVG(qh.EXECUTION_TIME)/1000 as avg_execution_seconds,
-            COUNT(DISTINCT q.USER_NAME) as unique_users,
-            COUNT(DISTINCT DATE_TRUNC('day', q.START_TIME)) as active_days
-        FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_ATTRIBUTION_HISTORY q
-        JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON q.QUERY_ID = qh.QUERY_ID
-        WHERE q.START_TIME >= '{start_date}' AND q.START_TIME <= '{end_date}'
-        AND q.WAREHOUSE_NAME IS NOT NULL
+            WAREHOUSE_NAME,
+            SUM(credits) as total_credits,
+            SUM(query_count) as total_queries,
+            SUM(total_execution_time) / NULLIF(SUM(query_count), 0) / 1000 as avg_execution_seconds,
+            COUNT(DISTINCT USER_NAME) as unique_users
+        FROM base
+        WHERE WAREHOUSE_NAME IS NOT NULL
         GROUP BY 1
+    ),
+    warehouse_savings AS (
+        SELECT 
+            CASE 
+                WHEN unique_users < 2 THEN total_credits * 0.3
+                WHEN avg_execution_seconds > 120 THEN total_credits * 0.2  
+                WHEN (total_credits / NULLIF(total_queries, 0)) > 0.01 THEN total_credits * 0.15
+                ELSE 0
+            END as potential_savings
+        FROM warehouse_inefficiency
+        WHERE total_credits > 1
+    ),
+    query_waste AS (
+        SELECT 
+            COALESCE(SUM(failed_credits), 0) * 0.5 as failed_query_waste,
+            COALESCE(SUM(spilled_credits), 0) * 0.2 as spillage_waste,
+            COALESCE(SUM(long_query_credits), 0) * 0.1 as long_query_waste
+        FROM base
+    ),
+    expensive_ai AS (
+        SELECT 
+            COALESCE(SUM(ai_credits), 0) as total_ai_credits
+        FROM snowflake_copy_cost_views.mart.ai_daily_rollup
+        WHERE usage_date >= ? AND usage_date <= ?
     )
+    -- Only the warehouse savings total is used by the page, so it is the only warehouse row returned.
+    -- HAS_SAVINGS flags each section server-side so the page decides which recommendations to show from it
     SELECT 
-        WAREHOUSE_NAME,
-        total_credits,
-        CASE 
-            WHEN unique_users < 2 THEN total_credits * 0.3
-            WHEN avg_execution_seconds > 120 THEN total_credits * 0.2  
-            WHEN (total_credits / NULLIF(total_queries, 0)) > 0.01 THEN total_credits * 0.15
-            ELSE 0
-        END as potential_savings,
-        CASE 
-            WHEN unique_users < 2 THEN 'Low utilization - consider consolidation'
-            WHEN avg_execution_seconds > 120 THEN 'Long execution times - consider optimization'
-            WHEN (total_credits / NULLIF(total_queries, 0)) > 0.01 THEN 'High cost per query - review sizing'
-            ELSE 'No issues identified'
-        END as recommendation
-    FROM warehouse_inefficiency
-    WHERE total_credits > 1
-    ORDER BY potential_savings DESC
+        'warehouse_total' as section,
+        COALESCE(SUM(potential_savings), 0) as potential_savings,
+        NULL as failed_query_waste,
+        NULL as spillage_waste,
+        NULL as long_query_waste,
+        IFF(COALESCE(SUM(potential_savings), 0) > 0, 1, 0) as has_savings
+    FROM warehouse_savings
+    UNION ALL
+    SELECT 'query_waste', NULL, failed_query_waste, spillage_waste, long_query_waste,
+        IFF(failed_query_waste + spillage_waste + long_query_waste > 0, 1, 0)
+    FROM query_waste
+    UNION ALL
+    SELECT 'ai', total_ai_credits * 0.1, NULL, NULL, NULL,  -- Assume 10% savings from optimization
+        IFF(total_ai_credits > 0, 1, 0)
+    FROM expensive_ai
     """
     
-    wh_savings = session.sql(warehouse_savings_query).to_pandas()
-    total_wh_savings = wh_savings['POTENTIAL_SAVINGS'].sum() if not wh_savings.empty else 0
+    return run_query(savings_query, [start_date, end_date] * 2)
+
+# Lay out a row of (label, value, format) metrics in one columns block
+def _metric_row(items):
+    cols = st.columns(len(items))
+    for col, (label, value, fmt) in zip(cols, items):
+        col.metric(label, fmt.format(value))
+
+if start_date and end_date and start_date <= end_date:
+    earliest = date.today() - timedelta(days=ROLLUP_DAYS)
+    if start_date < earliest:
+        st.warning(f"⚠️ Savings are only tracked for the last {ROLLUP_DAYS} days - days before {earliest} are not included.")
     
-    # Query efficiency savings
-    query_savings_query = f"""
-    SELECT 
-        SUM(CASE WHEN qh.EXECUTION_STATUS = 'FAILED' THEN q.CREDITS_ATTRIBUTED_COMPUTE * 0.5 ELSE 0 END) as failed_query_waste,
-        SUM(CASE WHEN (qh.BYTES_SPILLED_TO_LOCAL_STORAGE + qh.BYTES_SPILLED_TO_REMOTE_STORAGE) > 0 
-            THEN q.CREDITS_ATTRIBUTED_COMPUTE * 0.2 ELSE 0 END) as spillage_waste,
-        SUM(CASE WHEN qh.EXECUTION_TIME > 300000 THEN q.CREDITS_ATTRIBUTED_COMPUTE * 0.1 ELSE 0 END) as long_query_waste
-    FROM SNOWFLAKE.ACCOUNT_USAGE.QUERY_ATTRIBUTION_HISTORY q
-    JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON q.QUERY_ID = qh.QUERY_ID
-    WHERE q.START_TIME >= '{start_date}' AND q.START_TIME <= '{end_date}'
-    """
+    savings = fetch_savings(start_date, end_date)
+    
+    # Warehouse optimization savings
+    wh_total = savings[savings['SECTION'] == 'warehouse_total']
+    total_wh_savings = wh_total['POTENTIAL_SAVINGS'].iloc[0] if not wh_total.empty else 0
+    has_wh_savings = not wh_total.empty and bool(wh_total['HAS_SAVINGS'].iloc[0])
     
-    query_savings = session.sql(query_savings_query).to_pandas()
+    # Query efficiency savings
+    query_savings = savings[savings['SECTION'] == 'query_waste']
     
     if not query_savings.empty:
         failed_savings = query_savings['FAILED_QUERY_WASTE'].iloc[0] or 0
         spillage_savings = query_savings['SPILLAGE_WASTE'].iloc[0] or 0
         long_query_savings = query_savings['LONG_QUERY_WASTE'].iloc[0] or 0
+        has_query_savings = bool(query_savings['HAS_SAVINGS'].iloc[0])
     else:
         failed_savings = spillage_savings = long_query_savings = 0
+        has_query_savings = False
     
     # AI optimization savings
-    ai_savings_query = f"""
-    WITH expensive_ai AS (
-        SELECT 
-            SUM(cf.TOKEN_CREDITS) as total_ai_credits,
-            AVG(cf.TOKEN_CREDITS / NULLIF(cf.TOKENS, 0)) as avg_cost_per_token
-        FROM SNOWFLAKE.ACCOUNT_USAGE.CORTEX_FUNCTIONS_QUERY_USAGE_HISTORY cf
-        JOIN SNOWFLAKE.ACCOUNT_USAGE.QUERY_HISTORY qh ON cf.QUERY_ID = qh.QUERY_ID
-        WHERE qh.START_TIME >= '{start_date}' AND qh.START_TIME <= '{end_date}'
-    )
-    SELECT 
-        total_ai_credits,
-        total_ai_credits * 0.1 as potential_ai_savings  -- Assume 10% savings from optimization
-    FROM expensive_ai
-    """
-    
-    ai_savings_data = session.sql(ai_savings_query).to_pandas()
-    ai_savings_amount = ai_savings_data['POTENTIAL_AI_SAVINGS'].iloc[0] if not ai_savings_data.empty else 0
+    ai_savings_data = savings[savings['SECTION'] == 'ai']
+    ai_savings_amount = ai_savings_data['POTENTIAL_SAVINGS'].iloc[0] if not ai_savings_data.empty else 0
+    has_ai_savings = not ai_savings_data.empty and bool(ai_savings_data['HAS_SAVINGS'].iloc[0])
     
     # Total savings calculation
     total_potential_savings = (
@@ -156,116 +214,67 @@ if start_date and end_date and start_date <= end_date:
     )
     
     # Display savings summary
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric("Total Potential Savings", f"{total_potential_savings:.1f} credits")
-    
-    with col2:
-        st.metric("Warehouse Optimization", f"{total_wh_savings:.1f} credits")
-    
-    with col3:
-        query_total_savings = failed_savings + spillage_savings + long_query_savings
-        st.metric("Query Optimization", f"{query_total_savings:.1f} credits")
-    
-    with col4:
-        st.metric("AI Optimization", f"{ai_savings_amount:.1f} credits")
+    query_total_savings = failed_savings + spillage_savings + long_query_savings
+    _metric_row([
+        ("Total Potential Savings", total_potential_savings, "{:.1f} credits"),
+        ("Warehouse Optimization", total_wh_savings, "{:.1f} credits"),
+        ("Query Optimization", query_total_savings, "{:.1f} credits"),
+        ("AI Optimization", ai_savings_amount, "{:.1f} credits")
+    ])
     
     # Savings breakdown chart
-    if total_potential_savings > 0:
+    if has_wh_savings or has_query_savings or has_ai_savings:
         savings_breakdown = pd.DataFrame({
             'Category': ['Warehouse Optimization', 'Query Failures', 'Memory Spillage', 'Long Queries', 'AI Optimization'],
             'Potential Savings': [total_wh_savings, failed_savings, spillage_savings, long_query_savings, ai_savings_amount]
         })
         
-        fig_savings = px.pie(
-            savings_breakdown,
-            values='Potential Savings',
-            names='Category',
-            title="Potential Savings by Category",
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-        st.plotly_chart(fig_savings, use_container_width=True)
+        # Drop zero slices, and show a lone nonzero category as a metric instead of a one-slice pie
+        nonzero_savings = savings_breakdown[savings_breakdown['Potential Savings'] > 0]
+        
+        if len(nonzero_savings) >= 2:
+            fig_savings = px.pie(
+                nonzero_savings,
+                values='Potential Savings',
+                names='Category',
+                title="Potential Savings by Category",
+                color_discrete_sequence=px.colors.qualitative.Set3
+            )
+            st.plotly_chart(fig_savings, use_container_width=True)
+        else:
+            st.metric(
+                f"Potential Savings - {nonzero_savings['Category'].iloc[0]}",
+                f"{nonzero_savings['Potential Savings'].iloc[0]:.1f} credits"
+            )
         
         # Detailed recommendations
         st.subheader("📋 Prioritized Action Plan")
         
-        if total_wh_savings > 0:
-            st.markdown("""
-            <div class="savings-opportunity">
-                <h4>🏭 Warehouse Optimization (Highest Impact)</h4>
-                <ul>
-                    <li>Review underutilized warehouses for consolidation opportunities</li>
-                    <li>Right-size warehouses based on actual workload patterns</li>
-                    <li>Implement auto-suspend policies for idle warehouses</li>
-                </ul>
-            </div>
-            """, unsafe_allow_html=True)
+        if has_wh_savings:
+            st.markdown(WAREHOUSE_OPP_HTML, unsafe_allow_html=True)
         
-        if query_total_savings > 0:
-            st.markdown("""
-            <div class="savings-opportunity">
-                <h4>⚡ Query Optimization</h4>
-                <ul>
-                    <li>Provide query performance training to high-cost users</li>
-                    <li>Implement query monitoring and alerting</li>
-                    <li>Review and optimize frequently failing queries</li>
-                    <li>Address memory spillage through query tuning or warehouse sizing</li>
-                </ul>
-            </div>
-            """, unsafe_allow_html=True)
+        if has_query_savings:
+            st.markdown(QUERY_OPP_HTML, unsafe_allow_html=True)
         
-        if ai_savings_amount > 0:
-            st.markdown("""
-            <div class="savings-opportunity">
-                <h4>🤖 AI Cost Management</h4>
-                <ul>
-                    <li>Review AI function usage patterns for optimization opportunities</li>
-                    <li>Consider model selection based on cost-effectiveness</li>
-                    <li>Implement AI usage governance and monitoring</li>
-                </ul>
-            </div>
-            """, unsafe_allow_html=True)
+        if has_ai_savings:
+            st.markdown(AI_OPP_HTML, unsafe_allow_html=True)
         
         # Implementation timeline
         st.subheader("🗓️ Implementation Timeline")
         
-        timeline_data = pd.DataFrame({
-            'Priority': ['High', 'High', 'Medium', 'Medium', 'Low'],
-            'Action': [
-                'Consolidate underutilized warehouses',
-                'Implement auto-suspend policies', 
-                'Query optimization training',
-                'AI usage governance',
-                'Advanced query monitoring'
-            ],
-            'Estimated Savings': [
-                total_wh_savings * 0.6,
-                total_wh_savings * 0.4,
-                query_total_savings * 0.7,
-                ai_savings_amount,
-                query_total_savings * 0.3
-            ],
-            'Timeline': ['1-2 weeks', '1 week', '2-4 weeks', '2-3 weeks', '4-6 weeks']
-        })
-        
-        st.dataframe(timeline_data, use_container_width=True)
+        # Small fixed grid - render as a static table, with the savings pre-formatted inline
+        st.table([
+            {'Priority': 'High', 'Action': 'Consolidate underutilized warehouses', 'Estimated Savings': f"{total_wh_savings * 0.6:.1f}", 'Timeline': '1-2 weeks'},
+            {'Priority': 'High', 'Action': 'Implement auto-suspend policies', 'Estimated Savings': f"{total_wh_savings * 0.4:.1f}", 'Timeline': '1 week'},
+            {'Priority': 'Medium', 'Action': 'Query optimization training', 'Estimated Savings': f"{query_total_savings * 0.7:.1f}", 'Timeline': '2-4 weeks'},
+            {'Priority': 'Medium', 'Action': 'AI usage governance', 'Estimated Savings': f"{ai_savings_amount:.1f}", 'Timeline': '2-3 weeks'},
+            {'Priority': 'Low', 'Action': 'Advanced query monitoring', 'Estimated Savings': f"{query_total_savings * 0.3:.1f}", 'Timeline': '4-6 weeks'}
+        ])
     
     else:
         st.success("🎉 Great! No major cost optimization opportunities identified. Your Snowflake account appears to be well-optimized!")
         
-        st.markdown("""
-        <div class="metric-card">
-            <h4>✅ Best Practices Checklist</h4>
-            <ul>
-                <li>Regular monitoring of warehouse utilization</li>
-                <li>Ongoing query performance optimization</li>
-                <li>AI usage cost tracking</li>
-                <li>User education on efficient query practices</li>
-                <li>Periodic cost trend analysis</li>
-            </ul>
-        </div>
-        """, unsafe_allow_html=True)
+        st.markdown(BEST_PRACTICES_HTML, unsafe_allow_html=True)
 
 else:
     st.error("Please select a valid date range to begin analysis.")
@@ -1,8 +1,9 @@
 # Import python packages
 import streamlit as st
 import plotly.express as px
-from datetime import date, timedelta
-from snowflake.snowpark.context import get_active_session
+from lib.queries import current_user, OVERVIEW_SQL
+from lib.session import get_session
+from lib.sidebar import render_date_range
 
 # Configuration and setup
 st.set_page_config(
@@ -40,25 +41,23 @@ except:
     st.sidebar.info("Streamlit version: Unable to detect")
 
 # Get active session
-session = get_active_session()
+session = get_session()
 
-# Sidebar configuration
-st.sidebar.header("📊 Analysis Configuration")
+# Sidebar date range
+start_date, end_date = render_date_range(days_back=5)
 
-# Date range selection
-col1, col2 = st.sidebar.columns(2)
-with col1:
-    start_date = st.date_input(
-        "Start Date",
-        value=date.today() - timedelta(days=5),
-        key="start_date"
-    )
-with col2:
-    end_date = st.date_input(
-        "End Date", 
-        value=date.today() - timedelta(days=0),
-        key="end_date"
-    )
+# Cache the overview per user and date range so reruns reuse the result instead of re-querying Snowflake.
+# The user is part of the key because the secure views only return the current user's rows.
+@st.cache_data(ttl=3600, show_spinner=False)
+def fetch_overview(start_date, end_date, user_name):
+    # Single aggregate row - fetch it as a dict of native Python values instead of building a DataFrame
+    return get_session().sql(OVERVIEW_SQL, params=[start_date, end_date]).collect()[0].as_dict()
+
+# Lay out a row of (label, value, format) metrics in one columns block
+def _metric_row(items):
+    cols = st.columns(len(items))
+    for col, (label, value, fmt) in zip(cols, items):
+        col.metric(label, fmt.format(value))
 
 # Dashboard overview and navigation
 st.markdown("---")
@@ -69,46 +68,15 @@ if start_date and end_date and start_date <= end_date:
     
     # Get basic usage stats for current period
     try:
-        overview_query = f"""
-        SELECT 
-            COUNT(DISTINCT q.query_id) as total_queries,
-            ROUND(SUM(COALESCE(CREDITS_ATTRIBUTED_COMPUTE, 0)), 3) as compute_credits,
-            ROUND(SUM(COALESCE(CREDITS_USED_CLOUD_SERVICES, 0)), 3) as cs_credits,
-            ROUND(AVG(total_elapsed_time)/1000, 2) as avg_execution_seconds
-        FROM snowflake_copy_cost_views.account_usage.query_history q
-        INNER JOIN snowflake_copy_cost_views.account_usage.query_attribution_history qa ON q.query_id = qa.query_id
-        WHERE q.start_time >= '{start_date}' AND q.start_time <= '{end_date}'
-        """
-        
-        overview_df = session.sql(overview_query).to_pandas()
+        overview = fetch_overview(start_date, end_date, current_user())
         
-        if not overview_df.empty:
-            # Display key metrics
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                st.metric(
-                    "Total Queries",
-                    f"{int(overview_df['TOTAL_QUERIES'].iloc[0]):,}"
-                )
-            
-            with col2:
-                st.metric(
-                    "Compute Credits",
-                    f"{overview_df['COMPUTE_CREDITS'].iloc[0]:,.3f}"
-                )
-            
-            with col3:
-                st.metric(
-                    "Cloud Services Credits", 
-                    f"{overview_df['CS_CREDITS'].iloc[0]:,.3f}"
-                )
-            
-            with col4:
-                st.metric(
-                    "Avg Query Time (sec)",
-                    f"{overview_df['AVG_EXECUTION_SECONDS'].iloc[0]:,.2f}"
-                )
+        # Display key metrics
+        _metric_row([
+            ("Total Queries", overview['TOTAL_QUERIES'], "{:,}"),
+            ("Compute Credits", overview['COMPUTE_CREDITS'] or 0, "{:,.3f}"),
+            ("Cloud Services Credits", overview['CS_CREDITS'] or 0, "{:,.3f}"),
+            ("Avg Query Time (sec)", overview['AVG_EXECUTION_SECONDS'] or 0, "{:,.2f}")
+        ])
     except Exception as e:
         st.warning("⚠️ Unable to load overview metrics. Please check your database access.")
 
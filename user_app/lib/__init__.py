@@ -0,0 +1 @@
+# Shared helpers for the user dashboard pages
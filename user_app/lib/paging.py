@@ -0,0 +1,17 @@
+# Import python packages
+import math
+import streamlit as st
+
+# Show a large frame one page at a time, so each rerun only serializes the visible rows to the browser
+def paginate(df, key, page_size=50):
+    pages = max(math.ceil(len(df) / page_size), 1)
+    if pages == 1:
+        return df
+    # The page lives only in session state (no widget default), so it can be clamped without a warning
+    # when a narrower date range leaves fewer pages than the one last selected
+    st.session_state.setdefault(key, 1)
+    if st.session_state[key] > pages:
+        st.session_state[key] = pages
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key=key)
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size]
@@ -0,0 +1,359 @@
+# Import python packages
+import streamlit as st
+import pandas as pd
+from snowflake.snowpark import functions as F
+from lib.session import get_session
+
+# The secure views filter rows on CURRENT_USER(), so cached results must never be shared between users.
+# Look the user up once per browser session and make it part of every cache key.
+def current_user():
+    if 'current_user' not in st.session_state:
+        st.session_state.current_user = get_session().sql("SELECT CURRENT_USER()").collect()[0][0]
+    return st.session_state.current_user
+
+# Query profile links are built client-side from QUERY_ID instead of shipping a full URL string on every row.
+# The base URL is split out of the query_history view's query_id_url once, so a customised base URL
+# in the view definition (see README) still applies.
+QUERY_URL_PARTS_SQL = """
+SELECT 
+    SPLIT_PART(query_id_url, query_id, 1) AS url_prefix,
+    SPLIT_PART(query_id_url, query_id, 2) AS url_suffix
+FROM snowflake_copy_cost_views.account_usage.query_history
+LIMIT 1;
+"""
+
+def add_query_url(df):
+    if df.empty:
+        return df
+    if 'query_url_parts' not in st.session_state:
+        st.session_state.query_url_parts = tuple(get_session().sql(QUERY_URL_PARTS_SQL).collect()[0])
+    prefix, suffix = st.session_state.query_url_parts
+    df.insert(df.columns.get_loc('QUERY_ID') + 1, 'URL', prefix + df['QUERY_ID'] + suffix)
+    return df
+
+# Cache results per (SQL template, bind values, user). The templates are constant strings with ? binds,
+# so Snowflake reuses the compiled plan across date ranges and the cache key stays small.
+@st.cache_data(ttl=3600, show_spinner=False)
+def _run_query(sql, params, user_name):
+    return get_session().sql(sql, params=list(params)).to_pandas()
+
+def run_query(sql, params=()):
+    return _run_query(sql, tuple(params), current_user())
+
+# Wide row-level results (the detail pages) stay Arrow-backed rather than being copied into pandas
+# object columns, which is much cheaper to build for long text columns such as QUERY_TEXT
+@st.cache_data(ttl=3600, show_spinner=False)
+def _run_query_arrow(sql, params, user_name):
+    table = get_session().sql(sql, params=list(params)).to_arrow()
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+def run_query_arrow(sql, params=()):
+    return _run_query_arrow(sql, tuple(params), current_user())
+
+# Unbounded exports (full query history, including query text) are fetched fresh on each request and
+# never cached, so a large frame isn't held in app memory long after the download
+def fetch_export(sql, params=()):
+    table = get_session().sql(sql, params=list(params)).to_arrow()
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+# Submit independent queries together so Snowflake runs them concurrently, then wait for all of them
+@st.cache_data(ttl=3600, show_spinner=False)
+def _run_queries(sqls, params, user_name):
+    session = get_session()
+    jobs = [session.sql(sql, params=list(params)).to_pandas(block=False) for sql in sqls]
+    return [job.result() for job in jobs]
+
+def run_queries(*sqls, params=()):
+    return _run_queries(sqls, tuple(params), current_user())
+
+# Daily totals per warehouse and query type, shared by the Cloud Services and Resource Utilization pages.
+# Read from the per-user daily roll-up (see the install script) instead of scanning QUERY_HISTORY; its row
+# access policy keeps each user to their own rows. Only additive measures are returned so each page can
+# re-aggregate to its own grain locally, and both pages hit the same cache entry.
+QUERY_HISTORY_DAILY_SQL = """
+SELECT 
+    usage_date,
+    warehouse_name,
+    query_type,
+    SUM(query_count) AS query_count,
+    SUM(execution_time) AS execution_time,
+    SUM(compilation_time) AS compilation_time,
+    (SUM(bytes_scanned) / POWER(1024, 3))::FLOAT AS gb_scanned,
+    SUM(failed_queries) AS failed_queries,
+    SUM(successful_queries) AS successful_queries,
+    SUM(queries_with_spillage) AS queries_with_spillage,
+    SUM(cs_credits) AS cs_credits,
+    SUM(cs_query_count) AS cs_query_count,
+    SUM(cs_compilation_time) AS cs_compilation_time
+FROM snowflake_copy_cost_views.mart.query_history_daily
+WHERE usage_date >= ? AND usage_date <= ?
+GROUP BY 1, 2, 3;
+"""
+
+# The roll-up keeps a rolling window of this many days (see the install script)
+QUERY_HISTORY_DAILY_DAYS = 90
+
+def query_history_daily(start_date, end_date):
+    return run_query(QUERY_HISTORY_DAILY_SQL, [start_date, end_date])
+
+# SQL templates for the individual pages, kept here as the single source of each statement.
+# Each takes the start and end dates as ? binds.
+
+# Daily warehouse credits (Warehouse Usage page)
+WAREHOUSE_USAGE_SQL = """
+WITH wh_list AS (
+SELECT
+    warehouse_name,
+    credits_attributed_compute as credits_used,
+    DATE_TRUNC ('month', start_time):: DATE AS usage_month,
+    DATE_TRUNC ('day', start_time):: DATE AS usage_date
+FROM snowflake_copy_cost_views.account_usage.query_attribution_history
+WHERE usage_date >= ? and usage_date <= ?
+)
+SELECT
+    usage_date,
+    warehouse_name,
+    ROUND (SUM(credits_used), 2) AS "WH Credits"
+FROM wh_list
+GROUP BY 1, 2
+ORDER BY 1;
+"""
+
+def top_warehouse_usage(start_date, end_date):
+    return run_query(WAREHOUSE_USAGE_SQL, [start_date, end_date])
+
+# Daily AI function credits by model, and daily Cortex Analyst credits and requests (AI Usage page).
+# Built with the Snowpark DataFrame API so the filters, projection and aggregation are pushed down as one
+# plan per chart, with the dates sent as literals of a fixed shape. Both are submitted before either is
+# waited on, so they run concurrently.
+@st.cache_data(ttl=3600, show_spinner=False)
+def _ai_usage(start_date, end_date, user_name):
+    session = get_session()
+    ai_functions = (
+        session.table("snowflake_copy_cost_views.account_usage.cortex_functions_query_usage_history")
+        .select(
+            F.to_date(F.col("START_TIME")).alias("USAGE_DAY"),
+            F.iff(F.length(F.trim(F.col("MODEL_NAME"))) > 0, F.col("MODEL_NAME"), F.lit("default")).alias("MODEL_NAME"),
+            F.col("FUNCTION_NAME"),
+            F.col("TOKEN_CREDITS")
+        )
+        .filter(F.col("USAGE_DAY").between(F.lit(start_date), F.lit(end_date)))
+        .filter(F.length(F.trim(F.col("FUNCTION_NAME"))) > 0)
+        .group_by(F.to_char(F.col("USAGE_DAY"), "YYYY-MM-DD").alias("USAGE_DATE"), "MODEL_NAME", "FUNCTION_NAME")
+        .agg(F.round(F.sum("TOKEN_CREDITS"), 3).alias('"Credits"'))
+        .sort("USAGE_DATE")
+    )
+    cortex_analyst = (
+        session.table("snowflake_copy_cost_views.account_usage.cortex_analyst_usage_history")
+        .filter(F.col("START_TIME").between(F.lit(start_date), F.lit(end_date)))
+        .group_by(F.to_date(F.col("START_TIME")).alias("USAGE_DATE"))
+        .agg(
+            F.round(F.sum("CREDITS"), 3).alias('"Credits"'),
+            F.sum("REQUEST_COUNT").alias('"Requests"')
+        )
+        .sort("USAGE_DATE")
+    )
+    jobs = [ai_functions.to_pandas(block=False), cortex_analyst.to_pandas(block=False)]
+    return [job.result() for job in jobs]
+
+def ai_usage(start_date, end_date):
+    return _ai_usage(start_date, end_date, current_user())
+
+# Daily spilled GB per warehouse for the Spillage Analysis chart - aggregated in Snowflake so only
+# one row per day and warehouse comes back instead of one per spilling query. Byte totals are converted
+# to GB as FLOAT at the source, so pandas holds plain float columns rather than wide integers.
+SPILLAGE_DAILY_SQL = """
+SELECT 
+    DATE_TRUNC('day', start_time)::DATE AS usage_date,
+    warehouse_name,
+    (SUM(bytes_spilled_to_remote_storage) / POWER(1024, 3))::FLOAT AS "Remote Spillage",
+    (SUM(bytes_spilled_to_local_storage) / POWER(1024, 3))::FLOAT AS "Local spillage"
+FROM snowflake_copy_cost_views.account_usage.query_history
+WHERE (bytes_spilled_to_local_storage > 0
+OR bytes_spilled_to_remote_storage > 0 )
+AND start_time >= ? and start_time <= ?
+GROUP BY 1, 2;
+"""
+
+# The worst spilling queries for the Spillage Analysis table
+SPILLED_QUERIES_LIMIT = 500
+SPILLED_QUERIES_SQL = """
+SELECT 
+    DATE_TRUNC ('day', start_time):: DATE AS usage_date,
+    start_time,
+    BYTES_SPILLED_TO_REMOTE_STORAGE as "Remote Spillage",
+    bytes_spilled_to_local_storage as "Local spillage",
+    QUERY_ID,
+    WAREHOUSE_NAME, 
+    WAREHOUSE_SIZE, 
+    BYTES_SCANNED, 
+    USER_NAME 
+FROM snowflake_copy_cost_views.account_usage.query_history
+WHERE (bytes_spilled_to_local_storage > 0
+OR bytes_spilled_to_remote_storage > 0 )
+AND start_time >= ? and start_time <= ?
+ORDER BY bytes_spilled_to_remote_storage DESC, bytes_spilled_to_local_storage DESC
+LIMIT {0};
+""".format(SPILLED_QUERIES_LIMIT)
+
+# Query-level execution details, newest first (Query Details page) - the page appends its LIMIT
+QUERY_DETAILS_SQL = """
+SELECT 
+    DATE_TRUNC ('day', start_time):: DATE AS usage_date,
+    START_TIME,
+    QUERY_TEXT,
+    TOTAL_ELAPSED_TIME/1000 as EXECUTION_TIME_SECONDS,
+    QUERY_ID,
+    EXECUTION_STATUS,
+    ERROR_MESSAGE,
+    DATABASE_NAME,
+    SCHEMA_NAME,
+    WAREHOUSE_NAME,
+    BYTES_SCANNED,
+    ROWS_PRODUCED,
+    CREDITS_USED_CLOUD_SERVICES,
+    USER_NAME
+FROM snowflake_copy_cost_views.account_usage.query_history 
+WHERE start_time >= ? and start_time <= ?
+ORDER BY START_TIME DESC
+"""
+
+# AI function calls, newest first (AI Query Details page) - the page appends its LIMIT. QUERY_TEXT is
+# the widest column, so the table leaves it out and loads it for the selected row only
+AI_QUERY_DETAILS_SQL = """
+SELECT 
+    DATE_TRUNC ('day', start_time):: DATE AS usage_date,
+    START_TIME,
+    TOTAL_ELAPSED_TIME,
+    FUNCTION_NAME,
+    MODEL_NAME,
+    EXECUTION_STATUS,
+    TOKENS,
+    TOKEN_CREDITS,
+    QUERY_ID,
+    WAREHOUSE_NAME,
+    USER_NAME
+FROM snowflake_copy_cost_views.account_usage.cortex_functions_query_usage_history 
+WHERE start_time >= ? and start_time <= ?
+ORDER BY START_TIME DESC
+"""
+
+# Same rows including QUERY_TEXT, for the full CSV export
+AI_QUERY_EXPORT_SQL = """
+SELECT 
+    DATE_TRUNC ('day', start_time):: DATE AS usage_date,
+    START_TIME,
+    QUERY_TEXT,
+    TOTAL_ELAPSED_TIME,
+    FUNCTION_NAME,
+    MODEL_NAME,
+    EXECUTION_STATUS,
+    TOKENS,
+    TOKEN_CREDITS,
+    QUERY_ID,
+    WAREHOUSE_NAME,
+    USER_NAME
+FROM snowflake_copy_cost_views.account_usage.cortex_functions_query_usage_history 
+WHERE start_time >= ? and start_time <= ?
+ORDER BY START_TIME DESC
+"""
+
+# Text of a single query, bounded to the selected date range so QUERY_HISTORY can be pruned
+QUERY_TEXT_SQL = """
+SELECT QUERY_TEXT
+FROM snowflake_copy_cost_views.account_usage.query_history
+WHERE query_id = ?
+AND start_time >= ? and start_time <= ?;
+"""
+
+# Top 50 queries by compute credits (Expensive Queries page). The top 50 are picked from
+# QUERY_ATTRIBUTION_HISTORY alone, so only those ids are joined to QUERY_HISTORY for text and status.
+EXPENSIVE_QUERIES_SQL = """
+WITH top_ids AS (
+    SELECT 
+        QUERY_ID,
+        START_TIME,
+        WAREHOUSE_NAME,
+        QUERY_TAG,
+        USER_NAME,
+        SUM(CREDITS_ATTRIBUTED_COMPUTE + ZEROIFNULL(CREDITS_USED_QUERY_ACCELERATION)) AS credits
+    FROM snowflake_copy_cost_views.account_usage.query_attribution_history
+    WHERE start_time >= ? and start_time <= ?
+    GROUP BY ALL
+    ORDER BY credits DESC
+    LIMIT 50
+)
+SELECT 
+    DATE_TRUNC('day', t1.start_time):: DATE AS usage_date,
+    t1.START_TIME,
+    t2.QUERY_TEXT,
+    ROUND(t1.credits, 4) as CREDITS,
+    t1.QUERY_ID,
+    t2.TOTAL_ELAPSED_TIME/1000 as EXECUTION_TIME_SECONDS,
+    t1.WAREHOUSE_NAME,
+    t2.EXECUTION_STATUS,
+    t1.QUERY_TAG,
+    t1.USER_NAME
+FROM top_ids t1
+INNER JOIN snowflake_copy_cost_views.account_usage.query_history t2
+ON t1.query_id = t2.query_id
+-- Bound the QUERY_HISTORY side to the span of the selected queries so it can be pruned
+WHERE t2.start_time BETWEEN (SELECT MIN(start_time) FROM top_ids) AND (SELECT MAX(start_time) FROM top_ids)
+ORDER BY CREDITS DESC;
+"""
+
+# Top 50 AI queries by token credits (Expensive Queries page). QUERY_TEXT is kept out of the
+# aggregation and fetched from QUERY_HISTORY for the surviving 50 ids only.
+EXPENSIVE_AI_QUERIES_SQL = """
+WITH top_ids AS (
+    SELECT 
+        START_TIME,
+        SUM(TOKEN_CREDITS) AS credits,
+        TOTAL_ELAPSED_TIME,
+        QUERY_ID,
+        FUNCTION_NAME,
+        MODEL_NAME,
+        TOKENS,
+        TOKEN_CREDITS,
+        WAREHOUSE_NAME,
+        USER_NAME,
+        EXECUTION_STATUS
+    FROM snowflake_copy_cost_views.account_usage.cortex_functions_query_usage_history
+    WHERE start_time >= ? and start_time <= ?
+    GROUP BY ALL
+    ORDER BY credits DESC
+    LIMIT 50
+)
+SELECT 
+    DATE_TRUNC('day', t1.start_time):: DATE AS usage_date,
+    t1.START_TIME,
+    t2.QUERY_TEXT,
+    ROUND(t1.credits, 3) AS CREDITS,
+    t1.TOTAL_ELAPSED_TIME,
+    t1.QUERY_ID,
+    t1.FUNCTION_NAME,
+    t1.MODEL_NAME,
+    t1.TOKENS,
+    t1.TOKEN_CREDITS,
+    t1.WAREHOUSE_NAME,
+    t1.USER_NAME,
+    t1.EXECUTION_STATUS
+FROM top_ids t1
+INNER JOIN snowflake_copy_cost_views.account_usage.query_history t2
+ON t1.query_id = t2.query_id
+-- Bound the QUERY_HISTORY side to the span of the selected queries so it can be pruned
+WHERE t2.start_time BETWEEN (SELECT MIN(start_time) FROM top_ids) AND (SELECT MAX(start_time) FROM top_ids)
+ORDER BY CREDITS DESC;
+"""
+
+# Per-user totals for the home page overview
+OVERVIEW_SQL = """
+SELECT 
+    COUNT(DISTINCT q.query_id) as total_queries,
+    ROUND(SUM(COALESCE(CREDITS_ATTRIBUTED_COMPUTE, 0)), 3) as compute_credits,
+    ROUND(SUM(COALESCE(CREDITS_USED_CLOUD_SERVICES, 0)), 3) as cs_credits,
+    ROUND(AVG(total_elapsed_time)/1000, 2) as avg_execution_seconds
+FROM snowflake_copy_cost_views.account_usage.query_history q
+INNER JOIN snowflake_copy_cost_views.account_usage.query_attribution_history qa ON q.query_id = qa.query_id
+WHERE q.start_time >= ? AND q.start_time <= ?
+"""
@@ -0,0 +1,13 @@
+# Import python packages
+import streamlit as st
+from snowflake.snowpark.context import get_active_session
+
+# Reuse one Snowpark session across reruns and pages. It is pinned in st.session_state rather than
+# st.cache_resource so it is never shared between viewers - the secure views filter on CURRENT_USER().
+def get_session():
+    if 'snowpark_session' not in st.session_state:
+        session = get_active_session()
+        # Let Snowpark de-duplicate repeated subqueries in DataFrame-API plans as shared CTEs
+        session.cte_optimization_enabled = True
+        st.session_state.snowpark_session = session
+    return st.session_state.snowpark_session
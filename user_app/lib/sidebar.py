@@ -0,0 +1,29 @@
+# Import python packages
+import streamlit as st
+from datetime import date, timedelta
+
+# Sidebar date range shared by every page. The dates sit inside a form so changing both of them
+# triggers a single rerun, and the widget keys are the same on every page. Pages backed by a roll-up
+# with a rolling window pass history_days so the dates can't go further back than it.
+def render_date_range(days_back=7, history_days=None):
+    st.sidebar.header("📊 Analysis Configuration")
+    today = date.today()
+    earliest = today - timedelta(days=history_days) if history_days else None
+    with st.sidebar.form("date_range_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            start_date = st.date_input(
+                "Start Date",
+                value=today - timedelta(days=days_back),
+                min_value=earliest,
+                key="start_date"
+            )
+        with col2:
+            end_date = st.date_input(
+                "End Date",
+                value=today,
+                min_value=earliest,
+                key="end_date"
+            )
+        st.form_submit_button("Apply", use_container_width=True)
+    return start_date, end_date
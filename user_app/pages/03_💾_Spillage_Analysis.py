@@ -1,8 +1,9 @@
 # Import python packages
 import streamlit as st
-import plotly.express as px
-from datetime import date, timedelta
-from snowflake.snowpark.context import get_active_session
+import pandas as pd
+from lib.queries import run_queries, add_query_url, SPILLAGE_DAILY_SQL, SPILLED_QUERIES_SQL, SPILLED_QUERIES_LIMIT
+from lib.paging import paginate
+from lib.sidebar import render_date_range
 
 # Configuration and setup
 st.set_page_config(
@@ -14,66 +15,54 @@ st.set_page_config(
 st.title("💾 Spillage Analysis")
 st.markdown("Identify queries that spill to disk and their performance impact")
 
-# Get active session
-session = get_active_session()
+# Sidebar date range
+start_date, end_date = render_date_range()
 
-# Sidebar configuration
-st.sidebar.header("📊 Analysis Configuration")
+# Date ranges longer than this are charted in weekly buckets instead of daily
+CHART_WEEKLY_AFTER_DAYS = 92
 
-# Date range selection
-col1, col2 = st.sidebar.columns(2)
-with col1:
-    start_date = st.date_input(
-        "Start Date",
-        value=date.today() - timedelta(days=7),
-        key="start_date"
-    )
-with col2:
-    end_date = st.date_input(
-        "End Date", 
-        value=date.today() - timedelta(days=0),
-        key="end_date"
-    )
+# Static Vega-Lite spec - the data is passed separately, so Streamlit ships it as Arrow instead of JSON-encoding it into the figure
+SPILL_CHART_SPEC = {
+    "title": "Queries Spilled to Disk (GB)",
+    "mark": "bar",
+    "transform": [{"fold": ["Remote Spillage", "Local spillage"], "as": ["SPILL_TYPE", "GB"]}],
+    "encoding": {
+        "x": {"field": "USAGE_DATE", "type": "temporal", "timeUnit": "yearmonthdate", "title": "Date"},
+        "xOffset": {"field": "SPILL_TYPE"},
+        "y": {"field": "GB", "type": "quantitative", "aggregate": "sum", "title": "GB Spilled"},
+        "color": {"field": "WAREHOUSE_NAME", "type": "nominal", "title": "Warehouse"},
+        "tooltip": [
+            {"field": "USAGE_DATE", "type": "temporal", "timeUnit": "yearmonthdate", "title": "Date"},
+            {"field": "WAREHOUSE_NAME", "type": "nominal", "title": "Warehouse"},
+            {"field": "SPILL_TYPE", "type": "nominal", "title": "Spill Type"},
+            {"field": "GB", "type": "quantitative", "aggregate": "sum", "title": "GB Spilled", "format": ",.2f"}
+        ]
+    }
+}
 
 if start_date and end_date and start_date <= end_date:
     st.header("Queries Spilled to Disk")
     
-    query4 = """
-    SELECT 
-        DATE_TRUNC ('day', start_time):: DATE AS usage_date,
-        start_time,
-        BYTES_SPILLED_TO_REMOTE_STORAGE as "Remote Spillage",
-        bytes_spilled_to_local_storage as "Local spillage",
-        QUERY_ID,
-        query_id_url as URL, 
-        WAREHOUSE_NAME, 
-        WAREHOUSE_SIZE, 
-        BYTES_SCANNED, 
-        USER_NAME 
-    FROM snowflake_copy_cost_views.account_usage.query_history
-    WHERE (bytes_spilled_to_local_storage > 0
-    OR bytes_spilled_to_remote_storage > 0 )
-    AND start_time >= '{0}' and start_time <= '{1}'
-    ORDER BY bytes_spilled_to_remote_storage, bytes_spilled_to_local_storage DESC;
-    """.format(start_date, end_date)
-    
-    df4 = session.sql(query4).to_pandas()
+    # Chart totals are aggregated in Snowflake; the table only gets the worst spilling queries
+    spill_daily, df4 = run_queries(SPILLAGE_DAILY_SQL, SPILLED_QUERIES_SQL, params=[start_date, end_date])
+    df4 = add_query_url(df4)
     
     if not df4.empty:
-        fig4 = px.bar(df4,
-        x='USAGE_DATE',
-        y=['Remote Spillage', 'Local spillage'],
-        color='WAREHOUSE_NAME',
-        title="Queries Spilled to Disk (Bytes)",
-        labels={"USAGE_DATE": "Date", "Remote Spillage": "Bytes Spilled", "Local spillage": "Local Bytes Spilled"},
-        template="plotly_dark")
-        st.plotly_chart(fig4)
+        # Long ranges are charted per week so the bar count stays bounded however wide the range is
+        if (end_date - start_date).days > CHART_WEEKLY_AFTER_DAYS:
+            week_start = pd.to_datetime(spill_daily['USAGE_DATE']).dt.to_period('W').dt.start_time
+            spill_daily = spill_daily.assign(USAGE_DATE=week_start).groupby(['USAGE_DATE', 'WAREHOUSE_NAME'], as_index=False)[['Remote Spillage', 'Local spillage']].sum()
+        
+        st.vega_lite_chart(spill_daily, SPILL_CHART_SPEC, use_container_width=True)
         
         # Remove USAGE_DATE column and rename URL for better display
-        st.dataframe(df4, column_config={
+        st.dataframe(paginate(df4, key="spill_page"), column_config={
             "USAGE_DATE": None,
             "URL": st.column_config.LinkColumn(display_text='Query profile')
         }, hide_index=True, use_container_width=True)
+        
+        if len(df4) >= SPILLED_QUERIES_LIMIT:
+            st.caption(f"Showing the {SPILLED_QUERIES_LIMIT} queries with the most spillage. The chart covers all spilling queries.")
     else:
         st.info("No queries with spillage found for the selected date range.")
 
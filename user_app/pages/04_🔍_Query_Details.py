@@ -1,7 +1,8 @@
 # Import python packages
 import streamlit as st
-from datetime import date, timedelta
-from snowflake.snowpark.context import get_active_session
+from lib.queries import run_query_arrow, fetch_export, add_query_url, QUERY_DETAILS_SQL
+from lib.paging import paginate
+from lib.sidebar import render_date_range
 
 # Configuration and setup
 st.set_page_config(
@@ -13,59 +14,41 @@ st.set_page_config(
 st.title("🔍 Query Details")
 st.markdown("Detailed analysis of query execution metrics and performance")
 
-# Get active session
-session = get_active_session()
+# Sidebar date range
+start_date, end_date = render_date_range()
 
-# Sidebar configuration
-st.sidebar.header("📊 Analysis Configuration")
+# Row cap for the detail table - the full history is only fetched when exporting it
+row_cap = st.sidebar.number_input("Max rows", min_value=100, max_value=50000, value=1000, step=100, key="row_cap")
 
-# Date range selection
-col1, col2 = st.sidebar.columns(2)
-with col1:
-    start_date = st.date_input(
-        "Start Date",
-        value=date.today() - timedelta(days=7),
-        key="start_date"
-    )
-with col2:
-    end_date = st.date_input(
-        "End Date", 
-        value=date.today() - timedelta(days=0),
-        key="end_date"
-    )
+# Export lives in a fragment so clicking the button reruns only this section, not the whole page
+@st.fragment
+def full_csv_export(params):
+    if st.button("Prepare full CSV export", key="prepare_export"):
+        st.download_button(
+            "Download CSV",
+            add_query_url(fetch_export(QUERY_DETAILS_SQL, params)).to_csv(index=False),
+            file_name="query_details.csv",
+            mime="text/csv"
+        )
 
 if start_date and end_date and start_date <= end_date:
     st.header("Query Execution Details")
     
-    query4 = """
-    SELECT 
-        DATE_TRUNC ('day', start_time):: DATE AS usage_date,
-        START_TIME,
-        QUERY_TEXT,
-        TOTAL_ELAPSED_TIME/1000 as EXECUTION_TIME_SECONDS,
-        QUERY_ID,
-        query_id_url as URL,
-        EXECUTION_STATUS,
-        ERROR_MESSAGE,
-        DATABASE_NAME,
-        SCHEMA_NAME,
-        WAREHOUSE_NAME,
-        BYTES_SCANNED,
-        ROWS_PRODUCED,
-        CREDITS_USED_CLOUD_SERVICES,
-        USER_NAME
-    FROM snowflake_copy_cost_views.account_usage.query_history 
-    WHERE start_time >= '{0}' and start_time <= '{1}'
-    ORDER BY START_TIME DESC;""".format(start_date, end_date)
-    
-    df4 = session.sql(query4).to_pandas()
+    # Only the most recent rows are shipped to the browser
+    df4 = add_query_url(run_query_arrow(QUERY_DETAILS_SQL + "LIMIT {0};".format(int(row_cap)), [start_date, end_date]))
     
     if not df4.empty:
         # Remove USAGE_DATE column and rename URL for better display
-        st.dataframe(df4, column_config={
+        st.dataframe(paginate(df4, key="details_page"), column_config={
             "USAGE_DATE": None,
             "URL": st.column_config.LinkColumn(display_text='Query profile')
         }, hide_index=True, use_container_width=True)
+        
+        if len(df4) >= row_cap:
+            st.caption(f"Showing the {int(row_cap):,} most recent queries. Raise 'Max rows' or export the full history below.")
+        
+        # The unbounded query only runs when an export is requested, not on every rerun
+        full_csv_export([start_date, end_date])
     else:
         st.info("No query data found for the selected date range.")
 
@@ -1,7 +1,8 @@
 # Import python packages
 import streamlit as st
-from datetime import date, timedelta
-from snowflake.snowpark.context import get_active_session
+from lib.queries import run_query, run_query_arrow, fetch_export, add_query_url, AI_QUERY_DETAILS_SQL, AI_QUERY_EXPORT_SQL, QUERY_TEXT_SQL
+from lib.paging import paginate
+from lib.sidebar import render_date_range
 
 # Configuration and setup
 st.set_page_config(
@@ -13,57 +14,59 @@ st.set_page_config(
 st.title("🤖 AI Query Details")
 st.markdown("Detailed analysis of AI function queries including tokens and model usage")
 
-# Get active session
-session = get_active_session()
+# Sidebar date range
+start_date, end_date = render_date_range()
 
-# Sidebar configuration
-st.sidebar.header("📊 Analysis Configuration")
+# Row cap for the detail table - the full history is only fetched when exporting it
+row_cap = st.sidebar.number_input("Max rows", min_value=100, max_value=50000, value=1000, step=100, key="row_cap")
 
-# Date range selection
-col1, col2 = st.sidebar.columns(2)
-with col1:
-    start_date = st.date_input(
-        "Start Date",
-        value=date.today() - timedelta(days=7),
-        key="start_date"
-    )
-with col2:
-    end_date = st.date_input(
-        "End Date", 
-        value=date.today() - timedelta(days=0),
-        key="end_date"
-    )
+# Export lives in a fragment so clicking the button reruns only this section, not the whole page
+@st.fragment
+def full_csv_export(params):
+    if st.button("Prepare full CSV export", key="prepare_export"):
+        st.download_button(
+            "Download CSV",
+            add_query_url(fetch_export(AI_QUERY_EXPORT_SQL, params)).to_csv(index=False),
+            file_name="ai_query_details.csv",
+            mime="text/csv"
+        )
+
+# Selecting a row loads that query's text on demand - the table itself is fetched without QUERY_TEXT.
+# Runs as a fragment so a selection only reruns the table, not the whole page
+@st.fragment
+def ai_query_table(df, params):
+    df = paginate(df, key="ai_details_page")
+    # Keyed on the page, so a selection made on one page doesn't point at a row of the next
+    page = st.session_state.get("ai_details_page", 1)
+    
+    # Remove USAGE_DATE column and rename URL for better display
+    event = st.dataframe(df, column_config={
+        "USAGE_DATE": None,
+        "URL": st.column_config.LinkColumn(display_text='Query profile')
+    }, hide_index=True, use_container_width=True, on_select="rerun", selection_mode="single-row", key=f"ai_query_table_{page}")
+    
+    if event.selection.rows:
+        query_id = df['QUERY_ID'].iloc[event.selection.rows[0]]
+        query_text = run_query(QUERY_TEXT_SQL, [query_id] + params)
+        if not query_text.empty:
+            st.code(query_text['QUERY_TEXT'].iloc[0], language="sql")
+    else:
+        st.caption("Select a row to view its query text.")
 
 if start_date and end_date and start_date <= end_date:
     st.header("AI Query Execution Details")
     
-    query5 = """
-    SELECT 
-        DATE_TRUNC ('day', start_time):: DATE AS usage_date,
-        START_TIME,
-        QUERY_TEXT,
-        TOTAL_ELAPSED_TIME,
-        FUNCTION_NAME,
-        MODEL_NAME,
-        EXECUTION_STATUS,
-        TOKENS,
-        TOKEN_CREDITS,
-        QUERY_ID,
-        query_id_url as URL,
-        WAREHOUSE_NAME,
-        USER_NAME
-    FROM snowflake_copy_cost_views.account_usage.cortex_functions_query_usage_history 
-    WHERE start_time >= '{0}' and start_time <= '{1}'
-    ORDER BY START_TIME DESC;""".format(start_date, end_date)
-    
-    df5 = session.sql(query5).to_pandas()
+    # Only the most recent rows are shipped to the browser
+    df5 = add_query_url(run_query_arrow(AI_QUERY_DETAILS_SQL + "LIMIT {0};".format(int(row_cap)), [start_date, end_date]))
     
     if not df5.empty:
-        # Remove USAGE_DATE column and rename URL for better display
-        st.dataframe(df5, column_config={
-            "USAGE_DATE": None,
-            "URL": st.column_config.LinkColumn(display_text='Query profile')
-        }, hide_index=True, use_container_width=True)
+        ai_query_table(df5, [start_date, end_date])
+        
+        if len(df5) >= row_cap:
+            st.caption(f"Showing the {int(row_cap):,} most recent AI queries. Raise 'Max rows' or export the full history below.")
+        
+        # The unbounded query only runs when an export is requested, not on every rerun
+        full_csv_export([start_date, end_date])
     else:
         st.info("No AI query data found for the selected date range.")
 
@@ -1,8 +1,10 @@
 # Import python packages
 import streamlit as st
 import plotly.express as px
-from datetime import date, timedelta
-from snowflake.snowpark.context import get_active_session
+import pandas as pd
+from lib.queries import query_history_daily, QUERY_HISTORY_DAILY_DAYS
+from lib.paging import paginate
+from lib.sidebar import render_date_range
 
 # Configuration and setup
 st.set_page_config(
@@ -14,76 +16,64 @@ st.set_page_config(
 st.title("☁️ Cloud Services Breakdown")
 st.markdown("Analyze cloud services usage patterns and compilation costs")
 
-# Get active session
-session = get_active_session()
+# Sidebar date range
+start_date, end_date = render_date_range(history_days=QUERY_HISTORY_DAILY_DAYS)
 
-# Sidebar configuration
-st.sidebar.header("📊 Analysis Configuration")
+@st.cache_data(ttl=3600, show_spinner=False)
+def cs_by_query_type_chart(df):
+    fig = px.pie(df, 
+        values='CS_CREDITS', 
+        names='QUERY_TYPE',
+        title="Cloud Services Credits by Query Type")
+    return fig.to_dict()
 
-# Date range selection
-col1, col2 = st.sidebar.columns(2)
-with col1:
-    start_date = st.date_input(
-        "Start Date",
-        value=date.today() - timedelta(days=7),
-        key="start_date"
-    )
-with col2:
-    end_date = st.date_input(
-        "End Date", 
-        value=date.today() - timedelta(days=0),
-        key="end_date"
-    )
+@st.cache_data(ttl=3600, show_spinner=False)
+def cs_over_time_chart(df):
+    fig = px.bar(df,
+        x='USAGE_DATE',
+        y='CS_CREDITS',
+        color='QUERY_TYPE',
+        title="Cloud Services Credits Over Time",
+        labels={'USAGE_DATE': 'Date', 'CS_CREDITS': 'Cloud Services Credits'},
+        template='plotly_dark')
+    return fig.to_dict()
 
 if start_date and end_date and start_date <= end_date:
     st.header("Cloud Services Usage Analysis")
     
-    # Cloud Services detailed analysis
-    query8 = """
-    SELECT 
-        DATE_TRUNC('day', start_time)::DATE AS usage_date,
-        QUERY_TYPE,
-        WAREHOUSE_NAME,
-        ROUND(SUM(CREDITS_USED_CLOUD_SERVICES), 3) AS cs_credits,
-        COUNT(*) AS query_count,
-        ROUND(AVG(COMPILATION_TIME)/1000, 2) AS avg_compilation_seconds
-    FROM snowflake_copy_cost_views.ACCOUNT_USAGE.QUERY_HISTORY
-    WHERE start_time >= '{0}' AND start_time <= '{1}'
-        AND CREDITS_USED_CLOUD_SERVICES > 0
-    GROUP BY 1, 2, 3
-    ORDER BY 1 DESC, 4 DESC;
-    """.format(start_date, end_date)
+    # Cloud Services detailed analysis - derived from the shared daily QUERY_HISTORY aggregate
+    daily = query_history_daily(start_date, end_date)
+    cs_daily = daily[daily['CS_QUERY_COUNT'] > 0]
     
-    df8 = session.sql(query8).to_pandas()
+    df8 = pd.DataFrame({
+        'USAGE_DATE': cs_daily['USAGE_DATE'],
+        'QUERY_TYPE': cs_daily['QUERY_TYPE'],
+        'WAREHOUSE_NAME': cs_daily['WAREHOUSE_NAME'],
+        'CS_CREDITS': cs_daily['CS_CREDITS'].round(3),
+        'QUERY_COUNT': cs_daily['CS_QUERY_COUNT'],
+        'AVG_COMPILATION_SECONDS': (cs_daily['CS_COMPILATION_TIME'] / cs_daily['CS_QUERY_COUNT'] / 1000).round(2)
+    }).sort_values(['USAGE_DATE', 'CS_CREDITS'], ascending=False)
     
     if not df8.empty:
-        # Rename columns for better display
-        df8_display = df8.rename(columns={
-            "USAGE_DATE": "Date",
-            "QUERY_TYPE": "Query Type",
-            "WAREHOUSE_NAME": "Warehouse",
-            "CS_CREDITS": "Cloud Services Credits",
-            "QUERY_COUNT": "Query Count",
-            "AVG_COMPILATION_SECONDS": "Avg Compilation (sec)"
+        st.dataframe(paginate(df8, key="cs_page"), column_config={
+            "USAGE_DATE": st.column_config.Column("Date"),
+            "QUERY_TYPE": st.column_config.Column("Query Type"),
+            "WAREHOUSE_NAME": st.column_config.Column("Warehouse"),
+            "CS_CREDITS": st.column_config.Column("Cloud Services Credits"),
+            "QUERY_COUNT": st.column_config.Column("Query Count"),
+            "AVG_COMPILATION_SECONDS": st.column_config.Column("Avg Compilation (sec)")
         })
-        st.dataframe(df8_display)
+        
+        # Collapse the warehouse (and date) dimensions before charting so each figure only carries
+        # the rows it draws - one slice per query type, one bar segment per day and query type
+        cs_by_type = df8.groupby('QUERY_TYPE', as_index=False)['CS_CREDITS'].sum()
+        cs_by_day = df8.groupby(['USAGE_DATE', 'QUERY_TYPE'], as_index=False)['CS_CREDITS'].sum()
         
         # Cloud Services by Query Type
-        fig8 = px.pie(df8, 
-            values='CS_CREDITS', 
-            names='QUERY_TYPE',
-            title="Cloud Services Credits by Query Type")
-        st.plotly_chart(fig8)
+        st.plotly_chart(cs_by_query_type_chart(cs_by_type))
         
         # Cloud Services over time
-        fig8_time = px.bar(df8,
-            x='USAGE_DATE',
-            y='CS_CREDITS',
-            color='QUERY_TYPE',
-            title="Cloud Services Credits Over Time",
-            labels={'USAGE_DATE': 'Date', 'CS_CREDITS': 'Cloud Services Credits'},
-            template='plotly_dark')
-        st.plotly_chart(fig8_time)
+        st.plotly_chart(cs_over_time_chart(cs_by_day))
         
     else:
         st.info("No cloud services usage found for the selected date range.")
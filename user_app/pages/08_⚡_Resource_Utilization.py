@@ -1,8 +1,9 @@
 # Import python packages
 import streamlit as st
 import plotly.express as px
-from datetime import date, timedelta
-from snowflake.snowpark.context import get_active_session
+import pandas as pd
+from lib.queries import query_history_daily, QUERY_HISTORY_DAILY_DAYS
+from lib.sidebar import render_date_range
 
 # Configuration and setup
 st.set_page_config(
@@ -14,104 +15,110 @@ st.set_page_config(
 st.title("⚡ Resource Utilization & Efficiency")
 st.markdown("Analyze warehouse efficiency, query success rates, and resource usage patterns")
 
-# Get active session
-session = get_active_session()
+# Sidebar date range
+start_date, end_date = render_date_range(history_days=QUERY_HISTORY_DAILY_DAYS)
 
-# Sidebar configuration
-st.sidebar.header("📊 Analysis Configuration")
+@st.cache_data(ttl=3600, show_spinner=False)
+def efficiency_chart(df):
+    fig = px.scatter(df,
+        x='UNIQUE_QUERIES',
+        y='AVG_EXECUTION_SECONDS',
+        size='AVG_GB_SCANNED',
+        color='WAREHOUSE_NAME',
+        title="Warehouse Efficiency: Execution Time vs Query Volume",
+        labels={'UNIQUE_QUERIES': 'Number of Queries', 'AVG_EXECUTION_SECONDS': 'Avg Execution Time (sec)'},
+        template='plotly_dark')
+    return fig.to_dict()
 
-# Date range selection
-col1, col2 = st.sidebar.columns(2)
-with col1:
-    start_date = st.date_input(
-        "Start Date",
-        value=date.today() - timedelta(days=7),
-        key="start_date"
-    )
-with col2:
-    end_date = st.date_input(
-        "End Date", 
-        value=date.today() - timedelta(days=0),
-        key="end_date"
-    )
+@st.cache_data(ttl=3600, show_spinner=False)
+def success_rate_chart(df):
+    fig = px.bar(df,
+        x='USAGE_DATE',
+        y='SUCCESS_RATE',
+        color='WAREHOUSE_NAME',
+        title="Query Success Rate by Warehouse",
+        labels={'USAGE_DATE': 'Date', 'SUCCESS_RATE': 'Success Rate (%)'},
+        template='plotly_dark')
+    fig.update_layout(yaxis=dict(range=[0, 100]))
+    return fig.to_dict()
 
-if start_date and end_date and start_date <= end_date:
-    st.header("Warehouse Efficiency Analysis")
+@st.cache_data(ttl=3600, show_spinner=False)
+def data_scanned_chart(df):
+    fig = px.bar(df,
+        x='USAGE_DATE',
+        y='AVG_GB_SCANNED',
+        color='WAREHOUSE_NAME',
+        title="Average Data Scanned by Warehouse",
+        labels={'USAGE_DATE': 'Date', 'AVG_GB_SCANNED': 'Avg GB Scanned'},
+        template='plotly_dark')
+    return fig.to_dict()
+
+# The warehouse filter and everything it drives live in a fragment, so changing the selection
+# reruns only this section instead of the whole page
+@st.fragment
+def warehouse_efficiency(daily):
+    # Optional warehouse filter - applied locally so the shared daily aggregate stays a single cache entry
+    selected_warehouses = st.multiselect(
+        "Warehouses",
+        options=sorted(daily['WAREHOUSE_NAME'].dropna().unique()),
+        help="Leave empty to include all warehouses",
+        key="warehouse_filter"
+    )
+    if selected_warehouses:
+        wh_rows = daily[daily['WAREHOUSE_NAME'].isin(selected_warehouses)]
+    else:
+        wh_rows = daily[daily['WAREHOUSE_NAME'].notna()]
     
-    # Warehouse efficiency analysis
-    query10 = """
-    SELECT 
-        warehouse_name,
-        DATE_TRUNC('day', start_time)::DATE AS usage_date,
-        COUNT(DISTINCT query_id) AS unique_queries,
-        ROUND(AVG(execution_time)/1000, 2) AS avg_execution_seconds,
-        ROUND(AVG(compilation_time)/1000, 2) AS avg_compilation_seconds,
-        COUNT(CASE WHEN execution_status = 'FAILED' THEN 1 END) AS failed_queries,
-        COUNT(CASE WHEN execution_status = 'SUCCESS' THEN 1 END) AS successful_queries,
-        ROUND(AVG(bytes_scanned)/POWER(1024,3), 2) AS avg_gb_scanned,
-        COUNT(CASE WHEN bytes_spilled_to_local_storage > 0 OR bytes_spilled_to_remote_storage > 0 THEN 1 END) AS queries_with_spillage
-    FROM snowflake_copy_cost_views.ACCOUNT_USAGE.QUERY_HISTORY
-    WHERE start_time >= '{0}' AND start_time <= '{1}'
-        AND warehouse_name IS NOT NULL
-    GROUP BY 1, 2
-    ORDER BY 2 DESC, 3 DESC;
-    """.format(start_date, end_date)
+    wh_daily = wh_rows.groupby(['WAREHOUSE_NAME', 'USAGE_DATE'], as_index=False)[[
+        'QUERY_COUNT', 'EXECUTION_TIME', 'COMPILATION_TIME', 'GB_SCANNED',
+        'FAILED_QUERIES', 'SUCCESSFUL_QUERIES', 'QUERIES_WITH_SPILLAGE'
+    ]].sum()
     
-    df10 = session.sql(query10).to_pandas()
+    df10 = pd.DataFrame({
+        'WAREHOUSE_NAME': wh_daily['WAREHOUSE_NAME'],
+        'USAGE_DATE': wh_daily['USAGE_DATE'],
+        'UNIQUE_QUERIES': wh_daily['QUERY_COUNT'],
+        'AVG_EXECUTION_SECONDS': (wh_daily['EXECUTION_TIME'] / wh_daily['QUERY_COUNT'] / 1000).round(2),
+        'AVG_COMPILATION_SECONDS': (wh_daily['COMPILATION_TIME'] / wh_daily['QUERY_COUNT'] / 1000).round(2),
+        'FAILED_QUERIES': wh_daily['FAILED_QUERIES'],
+        'SUCCESSFUL_QUERIES': wh_daily['SUCCESSFUL_QUERIES'],
+        'SUCCESS_RATE': (100 * wh_daily['SUCCESSFUL_QUERIES'] / (wh_daily['SUCCESSFUL_QUERIES'] + wh_daily['FAILED_QUERIES'])).round(2),
+        'AVG_GB_SCANNED': (wh_daily['GB_SCANNED'] / wh_daily['QUERY_COUNT']).round(2),
+        'QUERIES_WITH_SPILLAGE': wh_daily['QUERIES_WITH_SPILLAGE']
+    }).sort_values(['USAGE_DATE', 'UNIQUE_QUERIES'], ascending=False)
     
     if not df10.empty:
-        # Rename columns for better display
-        df10_display = df10.rename(columns={
-            "WAREHOUSE_NAME": "Warehouse",
-            "USAGE_DATE": "Date", 
-            "UNIQUE_QUERIES": "Unique Queries",
-            "AVG_EXECUTION_SECONDS": "Avg Execution (sec)",
-            "AVG_COMPILATION_SECONDS": "Avg Compilation (sec)",
-            "FAILED_QUERIES": "Failed Queries",
-            "SUCCESSFUL_QUERIES": "Successful Queries",
-            "AVG_GB_SCANNED": "Avg GB Scanned",
-            "QUERIES_WITH_SPILLAGE": "Queries with Spillage"
+        st.dataframe(df10, column_config={
+            "WAREHOUSE_NAME": st.column_config.Column("Warehouse"),
+            "USAGE_DATE": st.column_config.Column("Date"),
+            "UNIQUE_QUERIES": st.column_config.Column("Unique Queries"),
+            "AVG_EXECUTION_SECONDS": st.column_config.Column("Avg Execution (sec)"),
+            "AVG_COMPILATION_SECONDS": st.column_config.Column("Avg Compilation (sec)"),
+            "FAILED_QUERIES": st.column_config.Column("Failed Queries"),
+            "SUCCESSFUL_QUERIES": st.column_config.Column("Successful Queries"),
+            "SUCCESS_RATE": st.column_config.Column("Success Rate (%)"),
+            "AVG_GB_SCANNED": st.column_config.Column("Avg GB Scanned"),
+            "QUERIES_WITH_SPILLAGE": st.column_config.Column("Queries with Spillage")
         })
-        st.dataframe(df10_display)
-        
-        # Calculate success rate for visualization
-        df10['success_rate'] = (df10['SUCCESSFUL_QUERIES'] / (df10['SUCCESSFUL_QUERIES'] + df10['FAILED_QUERIES'])) * 100
         
         # Efficiency visualization
-        fig10 = px.scatter(df10,
-            x='UNIQUE_QUERIES',
-            y='AVG_EXECUTION_SECONDS',
-            size='AVG_GB_SCANNED',
-            color='WAREHOUSE_NAME',
-            title="Warehouse Efficiency: Execution Time vs Query Volume",
-            labels={'UNIQUE_QUERIES': 'Number of Queries', 'AVG_EXECUTION_SECONDS': 'Avg Execution Time (sec)'},
-            template='plotly_dark')
-        st.plotly_chart(fig10)
+        st.plotly_chart(efficiency_chart(df10))
         
         # Success rate chart
-        fig_success = px.bar(df10,
-            x='USAGE_DATE',
-            y='success_rate',
-            color='WAREHOUSE_NAME',
-            title="Query Success Rate by Warehouse",
-            labels={'USAGE_DATE': 'Date', 'success_rate': 'Success Rate (%)'},
-            template='plotly_dark')
-        fig_success.update_layout(yaxis=dict(range=[0, 100]))
-        st.plotly_chart(fig_success)
+        st.plotly_chart(success_rate_chart(df10))
         
         # Data scanning patterns
-        fig_scan = px.bar(df10,
-            x='USAGE_DATE',
-            y='AVG_GB_SCANNED',
-            color='WAREHOUSE_NAME',
-            title="Average Data Scanned by Warehouse",
-            labels={'USAGE_DATE': 'Date', 'AVG_GB_SCANNED': 'Avg GB Scanned'},
-            template='plotly_dark')
-        st.plotly_chart(fig_scan)
+        st.plotly_chart(data_scanned_chart(df10))
         
     else:
         st.info("No resource utilization data found for the selected date range.")
 
+if start_date and end_date and start_date <= end_date:
+    st.header("Warehouse Efficiency Analysis")
+    
+    # Warehouse efficiency analysis - derived from the shared daily QUERY_HISTORY aggregate
+    daily = query_history_daily(start_date, end_date)
+    warehouse_efficiency(daily)
 else:
     st.error("Please select a valid date range to begin analysis.")
 